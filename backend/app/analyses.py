@@ -0,0 +1,156 @@
+# تحليلات الفنادق المحسوبة مسبقًا في hostel_analyses (_id = معرف الفندق) مع source_hash للموجه الذي وُلدت منه؛
+# اختلاف الهاش يعني أن الفندق أو القالب أو النموذج تغير فالتحليل قديم. الدوال تأخذ db صراحة ليستخدمها precompute_analyses.py
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.facilities import facility_labels
+from app.llm import llm_client
+from app.utils.ratelimit import RateLimiter
+
+# الحقول التي يقرأها الموجه؛ تكفي لحساب source_hash دون جلب المستند كاملاً
+PROMPT_FIELDS = ["name", "price_per_night", "rating", "facilities", "facility_codes", "description", "address"]
+SCAN_BATCH_SIZE = 500
+
+def build_analysis_messages(hostel: dict) -> List[Dict[str, str]]:
+    # بناء موجه الذكاء الاصطناعي
+    prompt = f"""
+    You are an AI travel assistant. Analyze the following hostel and provide a summary, list of advantages (pros), and list of disadvantages (cons).
+
+    Hostel: {hostel.get('name')}
+    Price: ${hostel.get('price_per_night')}
+    Rating: {hostel.get('rating')}/10
+    Facilities: {', '.join(facility_labels(hostel))}
+    Description: {hostel.get('description')}
+    Address: {hostel.get('address')}
+
+    Please provide the output in STRICT JSON format with the following structure:
+    {{
+        "summary": "A 2-3 sentence summary of the hostel.",
+        "pros": ["Advantage 1", "Advantage 2", "Advantage 3", "Advantage 4"],
+        "cons": ["Disadvantage 1", "Disadvantage 2", "Disadvantage 3"]
+    }}
+    Base the pros and cons on the price, rating, facilities, and description.
+    Ensure strict JSON output. Do not include markdown code blocks.
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that outputs strict JSON.",
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+
+def source_hash(model: str, messages: List[Dict[str, str]]) -> str:
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def normalize_analysis(data: dict) -> dict:
+    return {
+        "summary": data.get("summary", "No summary available."),
+        "pros": list(data.get("pros", [])),
+        "cons": list(data.get("cons", [])),
+    }
+
+async def generate_analysis(messages: List[Dict[str, str]]) -> dict:
+    analysis_json = await llm_client.complete(messages, response_format={"type": "json_object"})
+    return normalize_analysis(json.loads(analysis_json))
+
+async def get_stored_analysis(db, hostel_id, digest: str) -> Optional[dict]:
+    doc = await db.hostel_analyses.find_one({"_id": hostel_id, "source_hash": digest}, {"summary": 1, "pros": 1, "cons": 1})
+    if doc is None:
+        return None
+    doc.pop("_id")
+    return doc
+
+async def store_analysis(db, hostel_id, digest: str, model: str, result: dict):
+    await db.hostel_analyses.replace_one(
+        {"_id": hostel_id},
+        {"_id": hostel_id, **result, "source_hash": digest, "model": model, "generated_at": datetime.utcnow()},
+        upsert=True,
+    )
+
+async def precompute_analyses(db, concurrency: int = 4, per_minute: float = 30, limit: Optional[int] = None,
+                              query: Optional[dict] = None, prune: bool = True) -> dict:
+    """Generate analyses for hostels whose stored entry is missing or stale."""
+    model = llm_client.model
+    limiter = RateLimiter(per_minute)
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+    stats = {"scanned": 0, "fresh": 0, "generated": 0, "failed": 0, "pruned": 0}
+    started = time.perf_counter()
+
+    async def run(hostel_id, messages, digest):
+        try:
+            await limiter.acquire()
+            result = await generate_analysis(messages)
+            await store_analysis(db, hostel_id, digest, model, result)
+            stats["generated"] += 1
+        except Exception as e:
+            # يبقى المدخل القديم (إن وجد) ويُعاد المحاولة في التشغيل التالي
+            stats["failed"] += 1
+            print(f"Analysis for {hostel_id} failed: {e}")
+        finally:
+            slots.release()
+
+    async def process(batch):
+        # قراءة source_hash المخزنة للدفعة كلها باستعلام $in واحد
+        ids = [h["_id"] for h in batch]
+        stored = {d["_id"]: d.get("source_hash") async for d in db.hostel_analyses.find({"_id": {"$in": ids}}, {"source_hash": 1})}
+        for hostel in batch:
+            messages = build_analysis_messages(hostel)
+            digest = source_hash(model, messages)
+            if stored.get(hostel["_id"]) == digest:
+                stats["fresh"] += 1
+                continue
+            if limit is not None and stats["generated"] + stats["failed"] + len(pending) >= limit:
+                return False
+            await slots.acquire()
+            task = asyncio.create_task(run(hostel["_id"], messages, digest))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        return True
+
+    # مسح بنطاقات _id بدلاً من مؤشر واحد طويل: مع حد المعدل قد تستغرق الدفعة دقائق وينتهي المؤشر
+    last_id, complete = None, True
+    while complete:
+        scan = dict(query or {})
+        if last_id is not None:
+            scan["_id"] = {"$gt": last_id}
+        batch = await db.hostels.find(scan, PROMPT_FIELDS).sort("_id", 1).limit(SCAN_BATCH_SIZE).to_list(None)
+        if not batch:
+            break
+        stats["scanned"] += len(batch)
+        last_id = batch[-1]["_id"]
+        complete = await process(batch)
+    await asyncio.gather(*pending)
+
+    if prune and complete and not query:
+        # تحليلات فنادق حُذفت من الكتالوج
+        orphans = db.hostel_analyses.aggregate([
+            {"$lookup": {"from": "hostels", "localField": "_id", "foreignField": "_id", "as": "hostel"}},
+            {"$match": {"hostel": {"$size": 0}}},
+            {"$project": {"_id": 1}},
+        ])
+        ids = [doc["_id"] async for doc in orphans]
+        for i in range(0, len(ids), SCAN_BATCH_SIZE):
+            result = await db.hostel_analyses.delete_many({"_id": {"$in": ids[i:i + SCAN_BATCH_SIZE]}})
+            stats["pruned"] += result.deleted_count
+
+    stats["seconds"] = round(time.perf_counter() - started, 1)
+    return stats
+
+async def precompute_periodically(db, interval: float, concurrency: int, per_minute: float):
+    while True:
+        try:
+            stats = await precompute_analyses(db, concurrency, per_minute)
+            print(f"Analysis precompute: {stats}")
+        except Exception as e:
+            print(f"Analysis precompute failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,88 @@
+# إصدار الكتالوج وطلبات GET الشرطية: كل كتابة على الفنادق (create_hostel، المستورد، الترحيلات) ترفع عدادًا في catalogue_meta،
+# وكل عامل يحتفظ به في الذاكرة ويستطلعه كل CATALOGUE_VERSION_POLL_SECONDS. الوسم مشتق من الإصدار والمسار والمعاملات،
+# و If-None-Match المطابق يُرد عليه بـ 304 قبل أي استعلام؛ كتابة عامل آخر تظهر بعد الاستطلاع التالي فقط
+import hashlib
+from collections import deque
+from typing import Optional
+from fastapi import HTTPException, Request
+from pymongo import ReturnDocument
+from app.config import settings
+
+VERSION_ID = "version"
+# يُرفع عند تغيير شكل الاستجابات حتى لا تُعاد ETag قديمة بعد النشر
+RESPONSE_FORMAT = 1
+LOCAL_VERSIONS_KEPT = 1024
+
+async def read_catalogue_version(db) -> int:
+    doc = await db.catalogue_meta.find_one({"_id": VERSION_ID})
+    return doc["version"] if doc else 0
+
+async def bump_catalogue_version(db) -> int:
+    doc = await db.catalogue_meta.find_one_and_update(
+        {"_id": VERSION_ID}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    return doc["version"]
+
+class CatalogueVersion:
+    def __init__(self):
+        self.version = 0
+
+    async def build(self, db):
+        # يُستدعى عند البدء ودوريًا من refresh_periodically
+        self.version = max(self.version, await read_catalogue_version(db))
+
+    async def bump(self, db) -> int:
+        produced = await bump_catalogue_version(db)
+        self.version = max(self.version, produced)
+        return produced
+
+class LocalVersions:
+    # إصدارات أنتجتها كتابات هذه العملية وطبقها فهرس في الذاكرة بنفسه (add_hostel)، فلا تستدعي إعادة بنائه؛
+    # ما يخرج من النافذة يُعامل ككتابة خارجية، أي إعادة بناء زائدة لا أكثر
+    def __init__(self, max_entries: int = LOCAL_VERSIONS_KEPT):
+        self._versions = deque(maxlen=max_entries)
+
+    def add(self, version: int):
+        self._versions.append(version)
+
+    def covers(self, since: int, until: int) -> bool:
+        # كل كتابة ترفع الإصدار بـ $inc واحد، فكل رقم بين since و until كتابة واحدة
+        local = set(self._versions)
+        return all(v in local for v in range(since + 1, until + 1))
+
+def make_etag(version: int, request: Request) -> str:
+    # ترتيب المعاملات لا يغير النتيجة، فلا يغير الوسم
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"c{RESPONSE_FORMAT}.{version}.{digest}"'
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    # وسيط الضغط يضيف -br أو -gzip للوسم؛ نفس التمثيل قبل الضغط
+    for suffix in ('-br"', '-gzip"'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # "*" غير مدعوم: الرد عليه يتطلب معرفة وجود المورد، والتبعية تعمل قبل المسار
+    if not if_none_match:
+        return False
+    return any(_opaque(tag) == etag for tag in if_none_match.split(","))
+
+def cache_headers(etag: str) -> dict:
+    max_age = settings.CATALOGUE_MAX_AGE_SECONDS
+    # no-cache: المتصفح يخزن الاستجابة لكنه يتحقق منها في كل مرة (304 رخيص)
+    control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    return {"ETag": etag, "Cache-Control": control}
+
+async def catalogue_etag(request: Request) -> str:
+    """Dependency: the ETag for this request, or a 304 if the client already has it."""
+    etag = make_etag(catalogue_version.version, request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=cache_headers(etag))
+    return etag
+
+catalogue_version = CatalogueVersion()
@@ -0,0 +1,111 @@
+# الجزء المحسوب محليًا (بدون ذكاء اصطناعي) من المقارنة: مصفوفات NumPy لكل الفنادق
+# تبقي صفوف الجدول مفاتيح hostelN_has التي تعرضها الواجهة، مع قائمة has إضافية
+from typing import Dict, List, Tuple
+import numpy as np
+from app.facilities import FACILITY_LABELS, match_facility
+from app.utils.text import fold
+
+MAX_FACILITY_ROWS = 8
+
+def _facility_matrix(hostels: List[dict]) -> Tuple[List[str], np.ndarray]:
+    # الرمز الموحد إن وُجد ("Free WiFi" و "Wifi" مرفق واحد)، وإلا النص الأصلي المطوي
+    labels: Dict[str, str] = {}
+    keyed = []
+    for hostel in hostels:
+        keys = set()
+        for facility in hostel.get("facilities") or []:
+            codes = match_facility(facility)
+            for code in codes:
+                labels.setdefault(code, FACILITY_LABELS[code])
+                keys.add(code)
+            key = fold(facility)
+            if key and not codes:
+                labels.setdefault(key, facility.strip())
+                keys.add(key)
+        keyed.append(keys)
+    vocabulary = sorted(labels)
+    index = {key: j for j, key in enumerate(vocabulary)}
+    matrix = np.zeros((len(hostels), len(vocabulary)), dtype=bool)
+    for i, keys in enumerate(keyed):
+        matrix[i, [index[k] for k in keys]] = True
+    return [labels[k] for k in vocabulary], matrix
+
+def _row(feature: str, details: str, has: np.ndarray) -> dict:
+    flags = [bool(x) for x in has]
+    row = {"feature": feature, "details": details, "has": flags}
+    for i, flag in enumerate(flags, start=1):
+        row[f"hostel{i}_has"] = flag
+    return row
+
+def _fmt(value: float) -> str:
+    return f"{value:g}"
+
+def _vs(values) -> str:
+    return " vs ".join(values)
+
+def build_comparison_table(hostels: List[dict]) -> List[dict]:
+    prices = np.array([float(h.get("price_per_night") or 0) for h in hostels])
+    ratings = np.array([float(h.get("rating") or 0) for h in hostels])
+    names, facilities = _facility_matrix(hostels)
+
+    rows = [
+        _row("Cheaper Price",
+             f"{_vs('$' + _fmt(p) for p in prices)} (Δ ${_fmt(round(prices.max() - prices.min(), 2))})",
+             prices == prices.min()),
+        _row("Better Rating",
+             f"{_vs(_fmt(r) for r in ratings)} (Δ {_fmt(round(ratings.max() - ratings.min(), 2))})",
+             ratings == ratings.max()),
+    ]
+
+    # التقييم لكل دولار؛ الأسعار الصفرية تُعامل كقيمة غير معروفة
+    value = np.divide(ratings, prices, out=np.zeros_like(ratings), where=prices > 0)
+    rows.append(_row("Best Value", _vs(f"{_fmt(round(v * 100, 2))} pts/$100" for v in value), value == value.max()))
+
+    counts = facilities.sum(axis=1)
+    rows.append(_row("More Facilities", _vs(f"{c} facilities" for c in counts), counts == counts.max()))
+
+    holders = facilities.sum(axis=0)
+    shared = holders == len(hostels)
+    if shared.any():
+        shared_names = [names[j] for j in np.flatnonzero(shared)]
+        preview = ", ".join(shared_names[:5]) + ("..." if len(shared_names) > 5 else "")
+        rows.append(_row("Shared Facilities", f"{len(shared_names)} in common: {preview}", np.ones(len(hostels), dtype=bool)))
+
+    # الفروق في المرافق: الأكثر انتشارًا أولاً (دون أن تكون مشتركة بين الجميع)
+    differing = np.flatnonzero((holders > 0) & ~shared)
+    differing = differing[np.argsort(-holders[differing], kind="stable")][:MAX_FACILITY_ROWS]
+    for j in differing:
+        has = facilities[:, j]
+        owners = [hostels[i].get("name", f"Hostel {i + 1}") for i in np.flatnonzero(has)]
+        prefix = "Only at " if len(owners) == 1 else "Available at "
+        rows.append(_row(names[j], prefix + ", ".join(owners), has))
+    return rows
+
+def quick_verdict(hostels: List[dict]) -> Tuple[str, str]:
+    """Rule-based recommendation and summary used by mode=fast and as the AI fallback."""
+    prices = np.array([float(h.get("price_per_night") or 0) for h in hostels])
+    ratings = np.array([float(h.get("rating") or 0) for h in hostels])
+    _, facilities = _facility_matrix(hostels)
+    counts = facilities.sum(axis=1)
+
+    def spread(values, invert=False):
+        span = values.max() - values.min()
+        if span == 0:
+            return np.ones_like(values, dtype=float)
+        scaled = (values - values.min()) / span
+        return 1 - scaled if invert else scaled
+
+    score = 0.5 * spread(ratings) + 0.35 * spread(prices, invert=True) + 0.15 * spread(counts.astype(float))
+    best = int(score.argmax())
+    names = [h.get("name", f"Hostel {i + 1}") for i, h in enumerate(hostels)]
+
+    recommendation = f"{names[best]} offers the best balance of price, rating and facilities."
+    cheapest, top_rated, most_equipped = int(prices.argmin()), int(ratings.argmax()), int(counts.argmax())
+    analysis = "\n\n".join([
+        f"**Price:** {names[cheapest]} is the cheapest at ${_fmt(prices[cheapest])} per night "
+        f"(range ${_fmt(prices.min())}–${_fmt(prices.max())}).",
+        f"**Rating:** {names[top_rated]} has the highest rating at {_fmt(ratings[top_rated])} "
+        f"(range {_fmt(ratings.min())}–{_fmt(ratings.max())}).",
+        f"**Facilities:** {names[most_equipped]} lists the most facilities ({counts[most_equipped]}).",
+    ])
+    return recommendation, analysis
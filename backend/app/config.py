@@ -9,8 +9,61 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
+    # bcrypt يعمل في مجموعة خيوط محدودة؛ عند امتلاء الطابور نرد 503 بدلاً من تجويع باقي الطلبات
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+    GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+    # يسمح بتوجيه العميل إلى خادم محلي وهمي أثناء الاختبار
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+    LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    # ذاكرة تخزين مؤقت لنتائج الذكاء الاصطناعي: "memory" داخل العملية فقط، أو "mongo" مشتركة بين العمال
+    LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "mongo")
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    # مدة بقاء المستخدم المفكوك من JWT في الذاكرة؛ تحدد أقصى تأخير لرؤية تعديل من عامل آخر
+    PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    # أقل مدة بين عمليتي بناء لفهرسي الاقتراحات والتشابه؛ البناء نفسه لا يحدث إلا عند تغير إصدار الكتالوج
+    SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "30"))
+    SIMILAR_REFRESH_SECONDS = float(os.getenv("SIMILAR_REFRESH_SECONDS", "30"))
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    # توليد تحليلات الفنادق مسبقًا داخل التطبيق؛ 0 = معطل (استخدم precompute_analyses.py بدلاً منه)
+    ANALYSIS_PRECOMPUTE_INTERVAL_SECONDS = float(os.getenv("ANALYSIS_PRECOMPUTE_INTERVAL_SECONDS", "0"))
+    ANALYSIS_PRECOMPUTE_CONCURRENCY = int(os.getenv("ANALYSIS_PRECOMPUTE_CONCURRENCY", "4"))
+    ANALYSIS_PRECOMPUTE_PER_MINUTE = float(os.getenv("ANALYSIS_PRECOMPUTE_PER_MINUTE", "30"))
+    # إصدار الكتالوج يُقرأ دوريًا لالتقاط كتابات العمال الآخرين والمستورد؛ يحدد أقصى مدة لـ 304 قديم
+    CATALOGUE_VERSION_POLL_SECONDS = float(os.getenv("CATALOGUE_VERSION_POLL_SECONDS", "5"))
+    # 0 = المتصفح يتحقق في كل مرة (no-cache)؛ أكبر من 0 يسمح باستخدام النسخة المخزنة دون سؤال الخادم
+    CATALOGUE_MAX_AGE_SECONDS = int(os.getenv("CATALOGUE_MAX_AGE_SECONDS", "0"))
+    COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    # مستندات الفنادق الأكثر قراءة في ذاكرة كل عامل (app/repository.py)
+    HOSTEL_CACHE_MAX_ENTRIES = int(os.getenv("HOSTEL_CACHE_MAX_ENTRIES", "2048"))
+    # حفظ المقارنات في الخلفية (app/utils/writebehind.py): دفعة عند هذا الحجم أو بعد هذه المدة
+    COMPARISON_BATCH_SIZE = int(os.getenv("COMPARISON_BATCH_SIZE", "100"))
+    COMPARISON_FLUSH_SECONDS = float(os.getenv("COMPARISON_FLUSH_SECONDS", "1"))
+    COMPARISON_MAX_PENDING = int(os.getenv("COMPARISON_MAX_PENDING", "5000"))
+    # البريد: بدون SMTP_USER تُطبع الرسائل بدلاً من إرسالها
+    SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USER = os.getenv("SMTP_USER", "")
+    SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no")
+    SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+    SMTP_BATCH_SIZE = int(os.getenv("SMTP_BATCH_SIZE", "50"))
+    SMTP_POLL_SECONDS = float(os.getenv("SMTP_POLL_SECONDS", "10"))
+    SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+    SMTP_LEASE_SECONDS = int(os.getenv("SMTP_LEASE_SECONDS", "300"))
+    SMTP_MAX_ATTEMPTS = int(os.getenv("SMTP_MAX_ATTEMPTS", "6"))
+    SMTP_RETRY_BASE_SECONDS = float(os.getenv("SMTP_RETRY_BASE_SECONDS", "30"))
+    SMTP_RETRY_MAX_SECONDS = float(os.getenv("SMTP_RETRY_MAX_SECONDS", "3600"))
 
 settings = Settings()
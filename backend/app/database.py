@@ -1,7 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import settings
+from app.metrics import MongoCommandMetrics
 
-client = AsyncIOMotorClient(settings.MONGO_URL)
+client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=[MongoCommandMetrics()])
 db = client[settings.DB_NAME]
 
 async def get_database():
@@ -0,0 +1,80 @@
+# أعداد المرشحات لقائمة الفنادق: الطلب المرشح يشغل تجميع $facet واحدًا،
+# وغير المرشح يُقرأ من catalogue_facets المحسوبة مسبقًا (يحدثها المستورد و create_hostel)
+from datetime import datetime
+from typing import List
+
+PRICE_BOUNDARIES = [0, 25, 50, 75, 100, 125, 150, 200, 300]
+RATING_BOUNDARIES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10.0001]
+TOP_COUNTRIES = 50
+TOP_CITIES = 25
+TOP_FACILITIES = 20
+SUMMARY_ID = "all"
+
+def _top(field: str, limit: int) -> list:
+    return [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+    ]
+
+def build_facet_pipeline(query: dict) -> list:
+    return [
+        {"$match": query},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "countries": _top("country", TOP_COUNTRIES),
+            "cities": _top("city", TOP_CITIES),
+            "price_buckets": [{"$bucket": {
+                "groupBy": "$price_per_night", "boundaries": PRICE_BOUNDARIES, "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }}],
+            "rating_buckets": [{"$bucket": {
+                "groupBy": "$rating", "boundaries": RATING_BOUNDARIES, "default": "other",
+                "output": {"count": {"$sum": 1}},
+            }}],
+            "facilities": [{"$unwind": "$facility_codes"}] + _top("facility_codes", TOP_FACILITIES),
+        }},
+    ]
+
+def _counts(rows: List[dict]) -> List[dict]:
+    return [{"value": str(row["_id"]), "count": row["count"]} for row in rows if row["_id"] is not None]
+
+def _buckets(rows: List[dict], boundaries: list) -> List[dict]:
+    # $bucket يعيد الحد الأدنى فقط؛ نضيف الحد الأعلى من قائمة الحدود
+    upper = dict(zip(boundaries, boundaries[1:]))
+    buckets = []
+    for row in rows:
+        if row["_id"] == "other":
+            buckets.append({"min": boundaries[-1], "max": None, "count": row["count"]})
+        else:
+            buckets.append({"min": row["_id"], "max": upper[row["_id"]], "count": row["count"]})
+    return buckets
+
+async def compute_facets(db, query: dict) -> dict:
+    result = await db.hostels.aggregate(build_facet_pipeline(query)).to_list(1)
+    facets = result[0] if result else {}
+    total = facets.get("total") or [{"count": 0}]
+    return {
+        "total": total[0]["count"],
+        "countries": _counts(facets.get("countries", [])),
+        "cities": _counts(facets.get("cities", [])),
+        "price_buckets": _buckets(facets.get("price_buckets", []), PRICE_BOUNDARIES),
+        "rating_buckets": _buckets(facets.get("rating_buckets", []), RATING_BOUNDARIES),
+        "facilities": _counts(facets.get("facilities", [])),
+    }
+
+async def refresh_facet_summary(db) -> dict:
+    facets = await compute_facets(db, {})
+    await db.catalogue_facets.replace_one(
+        {"_id": SUMMARY_ID},
+        {"_id": SUMMARY_ID, **facets, "computed_at": datetime.utcnow()},
+        upsert=True,
+    )
+    return facets
+
+async def get_facet_summary(db) -> dict:
+    summary = await db.catalogue_facets.find_one({"_id": SUMMARY_ID}, {"_id": 0, "computed_at": 0})
+    if summary is None:
+        # أول طلب بعد النشر وقبل أي استيراد
+        summary = await refresh_facet_summary(db)
+    return summary
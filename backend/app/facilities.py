@@ -0,0 +1,92 @@
+# قاموس موحد للمرافق: كل مرفق نصي يطابق الأنماط أدناه ويُخزن كـ facility_codes (مفهرس لفلتر facilities=)
+# و facility_mask (بت لكل رمز). ترتيب البتات يتبع FACILITIES فالرموز الجديدة تضاف في الآخر فقط؛
+# ارفع VOCABULARY_VERSION عند تغيير أي نمط حتى يعيد setup_database اشتقاق الحقول
+import re
+from typing import Dict, Iterable, List
+from app.utils.text import fold
+
+VOCABULARY_VERSION = 1
+
+# (code, label, patterns)
+FACILITIES = [
+    ("wifi", "Wi-Fi", [r"wi-?fi", r"wireless", r"internet"]),
+    ("parking", "Parking", [r"parking", r"car park", r"garage"]),
+    ("pool", "Swimming pool", [r"\bpool\b(?! table)", r"swimming"]),
+    ("gym", "Fitness centre", [r"\bgym\b", r"fitness"]),
+    ("breakfast", "Breakfast", [r"breakfast"]),
+    ("restaurant", "Restaurant", [r"restaurant", r"dining"]),
+    ("bar", "Bar", [r"\bbar\b", r"lounge", r"pub\b"]),
+    ("air_conditioning", "Air conditioning", [r"air[ -]?condition", r"\ba/?c\b"]),
+    ("reception_24h", "24-hour reception", [r"24[ -]?h", r"24[ -]hour", r"round[ -]the[ -]clock"]),
+    ("airport_shuttle", "Airport shuttle", [r"shuttle", r"airport (transfer|transportation)"]),
+    ("spa", "Spa", [r"\bspa\b", r"massage", r"wellness"]),
+    ("laundry", "Laundry", [r"laundry", r"dry[ -]clean", r"washing machine"]),
+    ("kitchen", "Kitchen", [r"kitchen", r"cooking"]),
+    ("lockers", "Lockers", [r"locker", r"\bsafe\b", r"safety deposit"]),
+    ("pets", "Pets allowed", [r"\bpets?\b", r"pet[ -]friendly"]),
+    ("non_smoking", "Non-smoking", [r"non[ -]?smoking", r"smoke[ -]free"]),
+    ("accessible", "Accessible", [r"wheelchair", r"accessib", r"disabled"]),
+    ("elevator", "Elevator", [r"elevator", r"\blifts?\b"]),
+    ("luggage_storage", "Luggage storage", [r"luggage", r"baggage"]),
+    ("room_service", "Room service", [r"room service"]),
+    ("family_rooms", "Family rooms", [r"family room", r"kids?\b", r"children"]),
+    ("heating", "Heating", [r"heating"]),
+    ("tv", "TV", [r"\btv\b", r"television", r"cable channels", r"satellite"]),
+    ("garden", "Garden", [r"garden"]),
+    ("terrace", "Terrace", [r"terrace", r"balcony", r"patio", r"rooftop"]),
+    ("beach", "Beach access", [r"beach"]),
+    ("hot_tub", "Hot tub", [r"hot tub", r"jacuzzi", r"whirlpool"]),
+    ("sauna", "Sauna", [r"sauna", r"steam room"]),
+    ("business_centre", "Business centre", [r"business (centre|center)", r"meeting", r"conference"]),
+    ("tours", "Tour desk", [r"tour", r"excursion"]),
+    ("bike_rental", "Bike rental", [r"bike", r"bicycle", r"cycling"]),
+    ("ev_charging", "EV charging", [r"electric vehicle", r"\bev\b", r"charging station"]),
+]
+
+FACILITY_CODES = [code for code, _, _ in FACILITIES]
+FACILITY_LABELS = {code: label for code, label, _ in FACILITIES}
+FACILITY_BITS = {code: 1 << i for i, code in enumerate(FACILITY_CODES)}
+_PATTERNS = [(code, re.compile("|".join(patterns))) for code, _, patterns in FACILITIES]
+
+def match_facility(raw: str) -> List[str]:
+    """Codes matched by one free-text facility (possibly none, possibly several)."""
+    text = fold(raw)
+    return [code for code, pattern in _PATTERNS if pattern.search(text)] if text else []
+
+def canonical_facilities(raw_facilities: Iterable[str]) -> List[str]:
+    found = set()
+    for raw in raw_facilities or []:
+        found.update(match_facility(raw))
+    # ترتيب ثابت (ترتيب البتات) حتى يكون content_hash في الاستيراد ثابتًا
+    return [code for code in FACILITY_CODES if code in found]
+
+def facility_mask(codes: Iterable[str]) -> int:
+    mask = 0
+    for code in codes:
+        mask |= FACILITY_BITS[code]
+    return mask
+
+def canonical_fields(raw_facilities: Iterable[str]) -> Dict[str, object]:
+    codes = canonical_facilities(raw_facilities)
+    return {"facility_codes": codes, "facility_mask": facility_mask(codes), "facility_version": VOCABULARY_VERSION}
+
+def facility_labels(hostel: dict) -> List[str]:
+    # النسخة المختصرة للموجهات؛ المستندات التي لم تُطبَّع بعد ترسل نصها الأصلي
+    codes = hostel.get("facility_codes")
+    if codes is None:
+        codes = canonical_facilities(hostel.get("facilities"))
+    return [FACILITY_LABELS[code] for code in codes] or list(hostel.get("facilities") or [])
+
+def parse_facility_filter(value: str) -> List[str]:
+    """Turn `wifi,pool` (codes, labels or free text) into codes; ValueError on unknown terms."""
+    codes = []
+    for term in value.split(","):
+        term = fold(term)
+        if not term:
+            continue
+        code = term.replace("-", "_").replace(" ", "_")
+        matched = [code] if code in FACILITY_BITS else match_facility(term)
+        if not matched:
+            raise ValueError(term)
+        codes.extend(matched)
+    return list(dict.fromkeys(codes))
@@ -0,0 +1,70 @@
+# ترميز جغرافي دون اتصال من جدول CSV مرفق (app/data/geocodes.csv أو GEOCODES_PATH) حسب (الدولة، المدينة) والرمز البريدي
+# النتيجة نقطة GeoJSON في location؛ الفنادق بلا تطابق تحصل على location: None فلا يعيد الترحيل فحصها ولا يدخلها فهرس 2dsphere
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, Tuple
+from app.utils.text import fold
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geocodes.csv")
+MAX_RADIUS_KM = 50
+MAX_NEAR_RESULTS = 100
+
+def _pin(pin_code) -> str:
+    return fold(pin_code).replace(" ", "")
+
+class Geocoder:
+    def __init__(self, cities: Dict[Tuple[str, str], Tuple[float, float]], pins: Dict[Tuple[str, str], Tuple[float, float]]):
+        self.cities = cities
+        self.pins = pins
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Geocoder":
+        cities, pins = {}, {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                point = (float(row["lat"]), float(row["lng"]))
+                country = fold(row["country"])
+                if row.get("pin_code"):
+                    pins[(country, _pin(row["pin_code"]))] = point
+                else:
+                    cities[(country, fold(row["city"]))] = point
+        return cls(cities, pins)
+
+    def locate(self, country: str, city: str, pin_code: str = None) -> Dict[str, object]:
+        country = fold(country)
+        point = self.pins.get((country, _pin(pin_code))) if pin_code else None
+        precision = "pin_code"
+        if point is None:
+            point, precision = self.cities.get((country, fold(city))), "city"
+        if point is None:
+            return {"location": None, "location_precision": None}
+        lat, lng = point
+        # GeoJSON يضع خط الطول أولاً
+        return {"location": geo_point(lat, lng), "location_precision": precision}
+
+def geo_point(lat: float, lng: float) -> dict:
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+@lru_cache(maxsize=1)
+def get_geocoder() -> Geocoder:
+    # يُحمَّل مرة واحدة لكل عملية (بما فيها عمليات الاستيراد المتوازية)
+    return Geocoder.from_csv(os.getenv("GEOCODES_PATH") or DEFAULT_TABLE)
+
+def geocode(doc: dict) -> Dict[str, object]:
+    return get_geocoder().locate(doc.get("country"), doc.get("city"), doc.get("pin_code"))
+
+def build_near_pipeline(lat: float, lng: float, radius_km: float, query: dict, limit: int, projection: dict) -> list:
+    return [
+        # $geoNear يجب أن يكون أول مرحلة؛ يطبق الفلاتر ويرتب حسب المسافة باستخدام فهرس 2dsphere
+        {"$geoNear": {
+            "near": geo_point(lat, lng),
+            "key": "location",
+            "distanceField": "distance_m",
+            "maxDistance": radius_km * 1000,
+            "query": query,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+        {"$project": {**projection, "distance_m": 1, "location_precision": 1}},
+    ]
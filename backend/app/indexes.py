@@ -0,0 +1,153 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from app.catalogue import bump_catalogue_version
+from app.facilities import VOCABULARY_VERSION, canonical_fields
+from app.geo import geocode
+from app.utils.text import fold
+
+# كل الفهارس التي يديرها التطبيق تبدأ بهذه البادئة، وأي فهرس آخر لا نلمسه
+MANAGED_PREFIX = "hcp_"
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    name: str
+    keys: List[Tuple[str, int]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+# فهارس مطابقة لتركيبات الفلاتر التي يرسلها get_hostels، مع ترتيب الترقيم (rating, _id)
+# price_per_night في آخر المفتاح يسمح بتصفية السعر داخل الفهرس دون جلب المستند
+INDEXES = [
+    IndexSpec("hostels", "hcp_name_lower", [("name_lower", 1)]),
+    IndexSpec("hostels", "hcp_country_name_lower", [("country", 1), ("name_lower", 1)]),
+    IndexSpec("hostels", "hcp_country_rating_id", [("country", 1), ("rating", -1), ("_id", -1), ("price_per_night", 1)]),
+    IndexSpec("hostels", "hcp_rating_id", [("rating", -1), ("_id", -1), ("price_per_night", 1)]),
+    IndexSpec("hostels", "hcp_price", [("price_per_night", 1)]),
+    # الهوية الطبيعية للفنادق المستوردة (import_hotels.py --incremental)
+    IndexSpec("hostels", "hcp_source_key", [("source_key", 1)]),
+    # فلتر facilities=wifi,pool ($all على الرموز الموحدة) مع ترتيب الترقيم
+    IndexSpec("hostels", "hcp_facility_codes_rating_id", [("facility_codes", 1), ("rating", -1), ("_id", -1)]),
+    # بحث القرب (/api/hostels/near)؛ المستندات بدون location لا تدخل الفهرس
+    IndexSpec("hostels", "hcp_location", [("location", "2dsphere")]),
+    # البحث عن المستخدم بالبريد (get_current_user وتسجيل الدخول) يصبح بحثًا نقطيًا
+    IndexSpec("users", "hcp_users_email", [("email", 1)], {"unique": True}),
+    # سجل المقارنات لكل مستخدم، الأحدث أولاً؛ _id لكسر التعادل في ترقيم before=
+    IndexSpec("comparisons", "hcp_comparisons_user_created", [("user_id", 1), ("created_at", -1), ("_id", -1)]),
+    # حذف تلقائي لمدخلات ذاكرة نتائج الذكاء الاصطناعي المنتهية
+    IndexSpec("llm_cache", "hcp_llm_cache_expiry", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    # مطالبة مرسل البريد بالرسائل المستحقة، وحذف المرسلة بعد أسبوع
+    IndexSpec("email_outbox", "hcp_email_outbox_due", [("status", 1), ("next_attempt_at", 1)]),
+    IndexSpec("email_outbox", "hcp_email_outbox_sent_expiry", [("sent_at", 1)], {"expireAfterSeconds": 7 * 24 * 3600}),
+]
+
+def _normalize_keys(keys) -> list:
+    # الخادم قد يعيد الاتجاه كـ 1.0 بدلاً من 1
+    return [(k, int(v) if isinstance(v, (int, float)) else v) for k, v in keys]
+
+def _matches(spec: IndexSpec, info: dict) -> bool:
+    if _normalize_keys(info.get("key", [])) != _normalize_keys(spec.keys):
+        return False
+    for option, value in spec.options.items():
+        if info.get(option) != value:
+            return False
+    return True
+
+# ترحيل مكتمل يُسجل في catalogue_meta فلا يُمسح الكتالوج كله عند كل تشغيل
+MIGRATION_PREFIX = "migration:"
+SEARCH_FIELDS_MIGRATION_VERSION = 1
+LOCATION_MIGRATION_VERSION = 1
+
+async def _backfill(db, name: str, version: int, query: dict, projection: dict, derive, batch_size: int = 1000):
+    marker = MIGRATION_PREFIX + name
+    done = await db.catalogue_meta.find_one({"_id": marker})
+    if done and done.get("version") == version:
+        return 0
+    ops, updated = [], 0
+    async for doc in db.hostels.find(query, projection):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": derive(doc)}))
+        if len(ops) >= batch_size:
+            await db.hostels.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await db.hostels.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    # الكتاب اللاحقون (المستورد و create_hostel) يكتبون الحقول المشتقة بأنفسهم
+    await db.catalogue_meta.update_one(
+        {"_id": marker}, {"$set": {"version": version, "completed_at": datetime.utcnow()}}, upsert=True,
+    )
+    if updated:
+        print(f"Backfilled {name} on {updated} hostels")
+    return updated
+
+async def reset_migrations(db):
+    # لمن يكتب مستندات خامًا بدون الحقول المشتقة (scripts/seed_db.py): الترحيلات تعمل في التشغيل التالي
+    await db.catalogue_meta.delete_many({"_id": {"$regex": f"^{MIGRATION_PREFIX}"}})
+
+async def backfill_search_fields(db, batch_size: int = 1000):
+    # name_lower يُحسب في Python حتى يطابق fold المستخدم في الاستعلامات ($toLower في Mongo لا يطوي إلا ASCII)؛
+    # كل المستندات مرة واحدة، لأن الترحيل السابق كتب قيمًا بـ $toLower
+    return await _backfill(
+        db, "name_lower", SEARCH_FIELDS_MIGRATION_VERSION, {}, {"name": 1},
+        lambda doc: {"name_lower": fold(doc.get("name"))}, batch_size,
+    )
+
+async def backfill_facility_codes(db, batch_size: int = 1000):
+    # المستندات المنشأة قبل قاموس المرافق (أو بنسخة أقدم منه) تحصل على الحقول المشتقة
+    return await _backfill(
+        db, "facility_codes", VOCABULARY_VERSION, {"facility_version": {"$ne": VOCABULARY_VERSION}}, {"facilities": 1},
+        lambda doc: canonical_fields(doc.get("facilities")), batch_size,
+    )
+
+async def backfill_locations(db, batch_size: int = 1000):
+    # location: None يعني "حاولنا ولم نجد إحداثيات"، فلا يُعاد فحص المستند
+    return await _backfill(
+        db, "locations", LOCATION_MIGRATION_VERSION, {"location": {"$exists": False}}, {"country": 1, "city": 1, "pin_code": 1},
+        geocode, batch_size,
+    )
+
+async def ensure_collection_indexes(collection, specs: List[IndexSpec]):
+    """Create missing managed indexes, rebuild changed ones and drop retired ones."""
+    existing = await collection.index_information()
+    declared = {spec.name for spec in specs}
+
+    for name in existing:
+        if name.startswith(MANAGED_PREFIX) and name not in declared:
+            print(f"Dropping retired index {collection.name}.{name}")
+            await collection.drop_index(name)
+
+    for spec in specs:
+        info = existing.get(spec.name)
+        if info is not None:
+            if _matches(spec, info):
+                continue
+            print(f"Rebuilding changed index {collection.name}.{spec.name}")
+            await collection.drop_index(spec.name)
+        elif any(_matches(spec, other) for other in existing.values()):
+            # فهرس مطابق أُنشئ يدويًا باسم آخر؛ لا حاجة لتكراره
+            continue
+        try:
+            await collection.create_index(spec.keys, name=spec.name, **spec.options)
+            print(f"Created index {collection.name}.{spec.name}")
+        except OperationFailure as e:
+            # مثلاً بيانات مكررة تمنع فهرسًا فريدًا؛ لا نوقف تشغيل التطبيق بسببها
+            print(f"Could not create index {collection.name}.{spec.name}: {e}")
+
+def specs_for(collection_name: str, specs: List[IndexSpec] = INDEXES) -> List[IndexSpec]:
+    return [spec for spec in specs if spec.collection == collection_name]
+
+async def ensure_indexes(db, specs: List[IndexSpec] = INDEXES):
+    for collection_name in dict.fromkeys(spec.collection for spec in specs):
+        await ensure_collection_indexes(db[collection_name], specs_for(collection_name, specs))
+
+async def setup_database(db):
+    # يُستدعى من lifespan عند بدء التطبيق
+    updated = await backfill_search_fields(db)
+    updated += await backfill_facility_codes(db)
+    updated += await backfill_locations(db)
+    if updated:
+        await bump_catalogue_version(db)
+    await ensure_indexes(db)
@@ -0,0 +1,240 @@
+# عميل Groq واحد مشترك لكل مسارات الذكاء الاصطناعي، يفتحه ويغلقه lifespan في main.py
+# كل استدعاء يمر بحد التزامن ومهلة كلية (تشمل انتظار المكان) وإعادة محاولة وقاطع دائرة؛
+# عند الفشل السريع ترد المسارات بالاستجابة الاحتياطية
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+import httpx
+from groq import AsyncGroq, APIConnectionError, APIStatusError
+from app.config import settings
+from app.metrics import LLM_LATENCY, record_llm_usage
+
+class CircuitOpenError(Exception):
+    pass
+
+class LLMBusyError(Exception):
+    pass
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures, retry one call after `reset_timeout`."""
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_progress = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError("AI service circuit is open")
+        if state == "half_open":
+            # نسمح بطلب تجريبي واحد فقط؛ البقية تفشل سريعًا حتى تتضح النتيجة
+            if self.trial_in_progress:
+                raise CircuitOpenError("AI service circuit is half-open")
+            self.trial_in_progress = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_progress = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # استدعاء انتهى بخطأ من جهة العميل (4xx) أو أُلغي: لا يغيّر حالة الخدمة
+        self.trial_in_progress = False
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, asyncio.TimeoutError)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class LLMClient:
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None,
+                 timeout: float = 30.0, connect_timeout: float = 5.0, deadline: float = 60.0,
+                 max_connections: int = 20, max_concurrency: int = 16, max_retries: int = 2,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.deadline = deadline
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker(5, 30.0)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[AsyncGroq] = None
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.busy = 0
+
+    @classmethod
+    def from_settings(cls) -> "LLMClient":
+        return cls(
+            api_key=settings.GROQ_API_KEY,
+            model=settings.GROQ_MODEL,
+            base_url=settings.GROQ_BASE_URL,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            deadline=settings.LLM_DEADLINE_SECONDS,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            breaker=CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS),
+        )
+
+    @property
+    def client(self) -> AsyncGroq:
+        # يُنشأ عند أول استخدام أيضًا حتى تعمل السكربتات خارج lifespan
+        if self._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+            # إعادة المحاولة تتم هنا مع jitter، لذلك نعطل إعادة المحاولة الداخلية في SDK
+            self._client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client)
+        return self._client
+
+    async def start(self):
+        self.client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _create(self, messages: List[Dict[str, str]], started: float, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await self.client.chat.completions.create(messages=messages, model=self.model, **kwargs)
+            except Exception as e:
+                remaining = self.deadline - (time.monotonic() - started)
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                # full jitter، مع احترام Retry-After إذا أرسله الخادم
+                delay = _retry_after(e) or random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+                if delay >= remaining:
+                    raise
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    def _record(self, error: Optional[BaseException], mode: str, started: float):
+        LLM_LATENCY.labels(mode, "ok" if error is None else "error").observe(time.monotonic() - started)
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, Exception) and _is_retryable(error):
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _remaining(self, started: float) -> float:
+        return max(self.deadline - (time.monotonic() - started), 0.0)
+
+    async def _acquire(self, started: float):
+        # انتظار مكان شاغر جزء من المهلة نفسها؛ وإلا تتراكم الطلبات خلف الخدمة البطيئة بلا حد
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self._remaining(started))
+        except asyncio.TimeoutError:
+            self.busy += 1
+            raise LLMBusyError("No AI slot became free before the deadline") from None
+
+    def _check_breaker(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.short_circuited += 1
+            raise
+
+    async def complete(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Run one chat completion and return the message content."""
+        self._check_breaker()
+        self.calls += 1
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            await self._acquire(started)
+            try:
+                completion = await asyncio.wait_for(self._create(messages, started, **kwargs), self._remaining(started))
+            finally:
+                self.semaphore.release()
+            record_llm_usage(completion.usage)
+            return completion.choices[0].message.content
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._record(error, "complete", started)
+
+    async def stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas.
+
+        Retries only cover opening the stream; once tokens have been sent
+        to the client a failure is raised to the caller.
+        """
+        self._check_breaker()
+        self.calls += 1
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            await self._acquire(started)
+            try:
+                stream = await asyncio.wait_for(self._create(messages, started, stream=True, **kwargs), self._remaining(started))
+                async for chunk in stream:
+                    if time.monotonic() - started > self.deadline:
+                        raise asyncio.TimeoutError("LLM stream exceeded its deadline")
+                    # Groq يرسل الاستهلاك في آخر جزء ضمن x_groq
+                    record_llm_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                self.semaphore.release()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._record(error, "stream", started)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "busy": self.busy,
+            "breaker_state": self.breaker.state,
+        }
+
+llm_client = LLMClient.from_settings()
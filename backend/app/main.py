@@ -1,8 +1,62 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.analyses import precompute_periodically
+from app.auth import hashing_stats
+from app.catalogue import catalogue_version
+from app.config import settings
+from app.database import db
+from app.indexes import setup_database
+from app.llm import llm_client
+from app.metrics import MetricsMiddleware, register_stats, render_metrics
+from app.repository import hostel_repository
+from app.similar import similarity_index
+from app.suggest import suggestion_index
+from app.utils.cache import llm_cache
+from app.utils.compression import CompressionMiddleware
+from app.utils.email import email_sender
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.singleflight import llm_flight
+from app.utils.writebehind import comparison_writer
+from app.utils.refresh import rebuild_on_change, refresh_periodically
 from app.routes import auth, hostels, compare, analysis
 
-app = FastAPI(title="Hostel Comparison Platform API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await setup_database(db)
+    await catalogue_version.build(db)
+    await llm_client.start()
+    await suggestion_index.build(db)
+    await similarity_index.build(db)
+    refreshers = [
+        asyncio.create_task(rebuild_on_change(
+            suggestion_index, db, catalogue_version, settings.CATALOGUE_VERSION_POLL_SECONDS, settings.SUGGEST_REFRESH_SECONDS,
+            suggestion_index.local_versions,
+        )),
+        asyncio.create_task(rebuild_on_change(
+            similarity_index, db, catalogue_version, settings.CATALOGUE_VERSION_POLL_SECONDS, settings.SIMILAR_REFRESH_SECONDS,
+            similarity_index.local_versions,
+        )),
+        asyncio.create_task(refresh_periodically(catalogue_version, db, settings.CATALOGUE_VERSION_POLL_SECONDS)),
+        asyncio.create_task(email_sender.run()),
+        asyncio.create_task(hostel_repository.watch()),
+        asyncio.create_task(comparison_writer.run()),
+    ]
+    if settings.ANALYSIS_PRECOMPUTE_INTERVAL_SECONDS > 0:
+        refreshers.append(asyncio.create_task(precompute_periodically(
+            db, settings.ANALYSIS_PRECOMPUTE_INTERVAL_SECONDS,
+            settings.ANALYSIS_PRECOMPUTE_CONCURRENCY, settings.ANALYSIS_PRECOMPUTE_PER_MINUTE,
+        )))
+    yield
+    for task in refreshers:
+        task.cancel()
+    # المقارنات التي لم تُكتب بعد
+    await comparison_writer.close()
+    await email_sender.close()
+    await llm_client.close()
+
+app = FastAPI(title="Hostel Comparison Platform API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173", # افتراضي Vite
@@ -16,13 +70,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# بين CORS والمقاييس: الحجم المسجل في المقاييس هو الحجم المضغوط الفعلي
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# بعد CORS حتى تُقاس الاستجابات كاملة بما فيها رؤوس CORS
+app.add_middleware(MetricsMiddleware)
+
+register_stats({
+    "llm_cache": llm_cache.stats,
+    "principal_cache": auth.principal_cache.stats,
+    "llm_flight": llm_flight.stats,
+    "llm_client": llm_client.stats,
+    "password_hashing": hashing_stats,
+    "email": email_sender.stats,
+    "hostel_cache": hostel_repository.stats,
+    "comparison_writer": comparison_writer.stats,
+})
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(hostels.router, prefix="/api/hostels", tags=["Hostels"])
 app.include_router(compare.router, prefix="/api/compare", tags=["Compare"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["Analysis"])
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Hostel Comparison API"}
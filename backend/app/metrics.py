@@ -0,0 +1,109 @@
+# مقاييس Prometheus تُعرض على /metrics: زمن وحجم الطلبات حسب قالب المسار (لا المسار الخام، لتحديد عدد التسميات)،
+# أوامر Mongo حسب الاسم، استدعاءات الذكاء الاصطناعي والاستهلاك، وعدادات stats() الموجودة عبر StatsCollector.
+# المقاييس لكل عملية؛ مع عدة عمال uvicorn يعرض كل عامل أرقامه
+import time
+from typing import Callable, Dict
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served", ["method"])
+HTTP_RESPONSE_SIZE = Histogram("http_response_size_bytes", "HTTP response body size", ["method", "route"], buckets=SIZE_BUCKETS)
+
+MONGO_LATENCY = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command", "outcome"], buckets=MONGO_BUCKETS)
+
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM call latency, retries included", ["mode", "outcome"], buckets=LATENCY_BUCKETS)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the LLM provider", ["kind"])
+AI_FALLBACKS = Counter("ai_fallback_responses_total", "AI responses replaced by a local fallback", ["feature"])
+
+UNMATCHED_ROUTE = "unmatched"
+
+def route_template(scope) -> str:
+    """`/api/hostels/{hostel_id}` for a request to `/api/hostels/65f...`."""
+    if "route" not in scope:
+        return UNMATCHED_ROUTE
+    # route.path نسبي للراوتر المضمَّن في بعض إصدارات FastAPI؛ نعيد بناء القالب من المسار الكامل
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streamed bodies are measured as they are sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # المسارات غير المعروفة تُجمع تحت اسم واحد حتى لا تنفجر التسميات
+            route = route_template(scope)
+            HTTP_LATENCY.labels(method, route, str(status)).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "succeeded").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "failed").observe(event.duration_micros / 1e6)
+
+def record_llm_usage(usage):
+    if usage is None:
+        return
+    LLM_TOKENS.labels("prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.labels("completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+class StatsCollector:
+    """Exposes `stats()` dicts as gauges named app_<source>_<key>."""
+
+    def __init__(self, sources: Dict[str, Callable[[], dict]]):
+        self.sources = sources
+
+    def collect(self):
+        for source, stats in self.sources.items():
+            for key, value in stats().items():
+                name = f"app_{source}_{key}"
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    # قيم نصية (مثل حالة القاطع) تُصدَّر كتسمية بقيمة 1
+                    family = GaugeMetricFamily(name, f"{source} {key}", labels=["value"])
+                    family.add_metric([str(value)], 1)
+                else:
+                    family = GaugeMetricFamily(name, f"{source} {key}", value=value)
+                yield family
+
+def register_stats(sources: Dict[str, Callable[[], dict]]):
+    REGISTRY.register(StatsCollector(sources))
+
+def render_metrics():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
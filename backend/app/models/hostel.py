@@ -30,5 +30,63 @@ class HostelDB(HostelBase):
         populate_by_name = True
         arbitrary_types_allowed = True
 
+class GeoPoint(BaseModel):
+    type: str = "Point"
+    coordinates: List[float]
+
 class HostelResponse(HostelBase):
     id: str
+    facility_codes: List[str] = []
+    location: Optional[GeoPoint] = None
+
+class HostelSummary(BaseModel):
+    # شكل خفيف لقوائم البحث والاختيار، بدون الوصف والحقول الطويلة
+    id: str
+    name: str
+    country: str
+    city: str
+    price_per_night: float
+    rating: float
+    address: Optional[str] = None
+    image_url: Optional[str] = None
+
+class SimilarHostel(HostelSummary):
+    similarity: float
+
+class NearbyHostel(HostelSummary):
+    distance_km: float
+    # "pin_code" أو "city": الفنادق المحددة بمركز المدينة تتشارك نفس المسافة
+    location_precision: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class FacetBucket(BaseModel):
+    min: float
+    max: Optional[float] = None
+    count: int
+
+class HostelFacets(BaseModel):
+    total: int
+    countries: List[FacetCount]
+    cities: List[FacetCount]
+    price_buckets: List[FacetBucket]
+    rating_buckets: List[FacetBucket]
+    facilities: List[FacetCount]
+
+class SuggestedHostel(BaseModel):
+    id: str
+    name: str
+    city: str
+    country: str
+    rating: float
+
+class SuggestedCity(BaseModel):
+    city: str
+    country: str
+    count: int
+
+class Suggestions(BaseModel):
+    hostels: List[SuggestedHostel]
+    cities: List[SuggestedCity]
@@ -0,0 +1,122 @@
+# مسار قراءة مشترك لمستندات الفنادق مع LRU داخل العملية؛ get_many يملأ كل المفقود باستعلام $in واحد. المستندات المخزنة مشتركة فهي للقراءة فقط.
+# الإبطال: كتابات هذه العملية تستدعي invalidate، وكتابات غيرها تصل عبر change stream في watch،
+# أو عبر إصدار الكتالوج على mongod مستقل (بلا replica set). الملء الذي بدأ قبل إبطال لا يُخزن (generation)
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.catalogue import catalogue_version
+from app.config import settings
+from app.database import db
+
+# رمز الخطأ عندما لا يكون الخادم ضمن replica set
+CHANGE_STREAM_UNSUPPORTED = 40573
+DOCUMENT_EVENTS = {"insert", "update", "replace", "delete"}
+STREAM_RETRY_SECONDS = 5
+
+class HostelRepository:
+    def __init__(self, collection, max_entries: int = 2048):
+        self.collection = collection
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ObjectId, dict]" = OrderedDict()
+        self.generation = 0
+        # "stream" أو "version"؛ يُحدد عند تشغيل watch
+        self.mode = "version"
+        self.seen_version = catalogue_version.version
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        # في وضع الإصدار: أي كتابة في أي مكان تغير الإصدار وتفرغ الذاكرة
+        if self.mode == "version" and catalogue_version.version != self.seen_version:
+            self.seen_version = catalogue_version.version
+            self.clear()
+
+    async def get(self, hostel_id: ObjectId) -> Optional[dict]:
+        return (await self.get_many([hostel_id])).get(hostel_id)
+
+    async def get_many(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, dict]:
+        """Documents by _id; ids that do not exist are missing from the result."""
+        self._check_version()
+        found, missing = {}, []
+        for hostel_id in ids:
+            doc = self._entries.get(hostel_id)
+            if doc is None:
+                missing.append(hostel_id)
+            else:
+                self._entries.move_to_end(hostel_id)
+                found[hostel_id] = doc
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            generation = self.generation
+            docs = await self.collection.find({"_id": {"$in": missing}}).to_list(None)
+            for doc in docs:
+                found[doc["_id"]] = doc
+            # أُبطلت الذاكرة أثناء الاستعلام: النتيجة صالحة لهذا الطلب لكن لا نخزنها
+            if generation == self.generation:
+                self._store(docs)
+        return found
+
+    def _store(self, docs: List[dict]):
+        for doc in docs:
+            self._entries[doc["_id"]] = doc
+            self._entries.move_to_end(doc["_id"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, ids: Iterable[ObjectId]):
+        self.generation += 1
+        for hostel_id in ids:
+            if self._entries.pop(hostel_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    async def watch(self):
+        """Evict documents changed by other processes; runs for the app's lifetime."""
+        while True:
+            try:
+                async with self.collection.watch() as stream:
+                    self.mode = "stream"
+                    # ما تغير قبل فتح التدفق لم نره؛ نبدأ من ذاكرة فارغة
+                    self.clear()
+                    async for change in stream:
+                        if change["operationType"] in DOCUMENT_EVENTS:
+                            self.invalidate([change["documentKey"]["_id"]])
+                        else:
+                            self.clear()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    print("Change streams unavailable (standalone mongod); hostel cache follows the catalogue version instead")
+                    self.seen_version = catalogue_version.version
+                    self.mode = "version"
+                    self.clear()
+                    return
+                print(f"Hostel change stream failed: {e}")
+            except Exception as e:
+                print(f"Hostel change stream failed: {e}")
+            finally:
+                # انقطاع التدفق لأي سبب (خطأ أو إلغاء): لا نعرف ما فاتنا، فنعود إلى وضع الإصدار حتى يُعاد فتحه
+                self.mode = "version"
+            self.seen_version = catalogue_version.version
+            self.clear()
+            await asyncio.sleep(STREAM_RETRY_SECONDS)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "mode": self.mode,
+        }
+
+hostel_repository = HostelRepository(db.hostels, settings.HOSTEL_CACHE_MAX_ENTRIES)
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List
-import json
 from app.database import db
 from bson import ObjectId
-from groq import AsyncGroq
+from app.analyses import build_analysis_messages, generate_analysis, get_stored_analysis, normalize_analysis, source_hash, store_analysis
 from app.config import settings
+from app.llm import llm_client
+from app.metrics import AI_FALLBACKS
+from app.repository import hostel_repository
 from app.routes.auth import get_current_user
+from app.utils.cache import LLMCache, llm_cache
+from app.utils.jsonstream import JSONStreamParser
+from app.utils.singleflight import llm_flight
+from app.utils.sse import sse_event, sse_response
 
 router = APIRouter()
 
@@ -18,68 +24,97 @@ class AnalysisResponse(BaseModel):
     pros: List[str]
     cons: List[str]
 
-@router.post("/hostel", response_model=AnalysisResponse)
-async def analyze_single_hostel(request: AnalysisRequest, current_user: dict = Depends(get_current_user)):
-    if not ObjectId.is_valid(request.hostel_id):
+async def _load_hostel(hostel_id: str) -> dict:
+    if not ObjectId.is_valid(hostel_id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-        
-    hostel = await db.hostels.find_one({"_id": ObjectId(request.hostel_id)})
+
+    hostel = await hostel_repository.get(ObjectId(hostel_id))
     if not hostel:
         raise HTTPException(status_code=404, detail="Hostel not found")
-        
-    # بناء موجه الذكاء الاصطناعي
-    prompt = f"""
-    You are an AI travel assistant. Analyze the following hostel and provide a summary, list of advantages (pros), and list of disadvantages (cons).
-
-    Hostel: {hostel.get('name')}
-    Price: ${hostel.get('price_per_night')}
-    Rating: {hostel.get('rating')}/10
-    Facilities: {', '.join(hostel.get('facilities', []))}
-    Description: {hostel.get('description')}
-    Address: {hostel.get('address')}
-
-    Please provide the output in STRICT JSON format with the following structure:
-    {{
-        "summary": "A 2-3 sentence summary of the hostel.",
-        "pros": ["Advantage 1", "Advantage 2", "Advantage 3", "Advantage 4"],
-        "cons": ["Disadvantage 1", "Disadvantage 2", "Disadvantage 3"]
-    }}
-    Base the pros and cons on the price, rating, facilities, and description.
-    Ensure strict JSON output. Do not include markdown code blocks.
-    """
-    
+    return hostel
+
+def _to_response(data: dict) -> AnalysisResponse:
+    return AnalysisResponse(**normalize_analysis(data))
+
+def _fallback_analysis(hostel: dict) -> AnalysisResponse:
+    # احتياطي
+    AI_FALLBACKS.labels("analysis").inc()
+    return AnalysisResponse(
+        summary="AI Analysis unavailable at the moment.",
+        pros=["Price: $" + str(hostel.get('price_per_night')), "Rating: " + str(hostel.get('rating'))],
+        cons=["Could not generate detailed analysis."]
+    )
+
+@router.post("/hostel", response_model=AnalysisResponse)
+async def analyze_single_hostel(request: AnalysisRequest, current_user: dict = Depends(get_current_user)):
+    hostel = await _load_hostel(request.hostel_id)
+    messages = build_analysis_messages(hostel)
+    digest = source_hash(settings.GROQ_MODEL, messages)
+
+    # التحليل المحسوب مسبقًا (precompute_analyses.py) ما دام الفندق لم يتغير
+    stored = await get_stored_analysis(db, hostel["_id"], digest)
+    if stored is not None:
+        return AnalysisResponse(**stored)
+
+    # نفس الفندق بنفس البيانات والنموذج => نفس التحليل، بدون استدعاء Groq
+    cache_key = LLMCache.make_key("analysis", settings.GROQ_MODEL, messages)
+    cached = await llm_cache.get(cache_key)
+    if cached is not None:
+        return AnalysisResponse(**cached)
+
+    async def generate():
+        result = await generate_analysis(messages)
+        await llm_cache.set(cache_key, result)
+        await store_analysis(db, hostel["_id"], digest, settings.GROQ_MODEL, result)
+        return result
+
     try:
-        client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-        
-        chat_completion = await client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that outputs strict JSON.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            response_format={"type": "json_object"},
-        )
-        
-        analysis_json = chat_completion.choices[0].message.content
-        data = json.loads(analysis_json)
-        
-        return AnalysisResponse(
-            summary=data.get("summary", "No summary available."),
-            pros=data.get("pros", []),
-            cons=data.get("cons", [])
-        )
-        
+        # الطلبات المتزامنة لنفس الفندق تنتظر استدعاء Groq واحدًا
+        return AnalysisResponse(**await llm_flight.do(cache_key, generate))
+
     except Exception as e:
         print(f"AI Analysis Error: {e}")
-        # احتياطي
-        return AnalysisResponse(
-            summary="AI Analysis unavailable at the moment.",
-            pros=["Price: $" + str(hostel.get('price_per_night')), "Rating: " + str(hostel.get('rating'))],
-            cons=["Could not generate detailed analysis."]
-        )
+        return _fallback_analysis(hostel)
+
+@router.post("/hostel/stream")
+async def analyze_single_hostel_stream(request: AnalysisRequest, current_user: dict = Depends(get_current_user)):
+    # نسخة SSE: summary، ثم حدث pro / con لكل عنصر عند تحليله، ثم done بالاستجابة الكاملة؛
+    # عند الفشل error بالتحليل الاحتياطي
+    hostel = await _load_hostel(request.hostel_id)
+    messages = build_analysis_messages(hostel)
+    digest = source_hash(settings.GROQ_MODEL, messages)
+    cache_key = LLMCache.make_key("analysis", settings.GROQ_MODEL, messages)
+
+    async def event_stream():
+        cached = await get_stored_analysis(db, hostel["_id"], digest) or await llm_cache.get(cache_key)
+        if cached is not None:
+            yield sse_event("summary", {"summary": cached["summary"]})
+            for pro in cached["pros"]:
+                yield sse_event("pro", {"text": pro})
+            for con in cached["cons"]:
+                yield sse_event("con", {"text": con})
+            yield sse_event("done", cached)
+            return
+
+        parser = JSONStreamParser()
+        try:
+            async for delta in llm_client.stream(messages):
+                for kind, key, value in parser.feed(delta):
+                    if kind == "field" and key == "summary":
+                        yield sse_event("summary", {"summary": value})
+                    elif kind == "item" and key == "pros":
+                        yield sse_event("pro", {"text": value})
+                    elif kind == "item" and key == "cons":
+                        yield sse_event("con", {"text": value})
+            data = parser.result()
+            result = _to_response(data).model_dump()
+        except Exception as e:
+            print(f"AI Analysis Stream Error: {e}")
+            yield sse_event("error", _fallback_analysis(hostel).model_dump())
+            return
+
+        await llm_cache.set(cache_key, result)
+        await store_analysis(db, hostel["_id"], digest, settings.GROQ_MODEL, result)
+        yield sse_event("done", result)
+
+    return sse_response(event_stream())
@@ -1,19 +1,30 @@
-from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, Depends
 import uuid
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.database import db
 from app.models.user import UserCreate, UserResponse, UserDB
-from app.auth import get_password_hash, verify_password, create_access_token
+from app.auth import get_password_hash_async, verify_password_async, create_access_token
 from app.config import settings
 from datetime import timedelta
 from bson import ObjectId
-from app.utils.email import send_email_background
+from pymongo.errors import DuplicateKeyError
+from app.utils.cache import MemoryCacheBackend, TieredCache
+from app.utils.email import email_sender
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 from jose import jwt, JWTError
 
+# المستخدمون المفكوكون من JWT مخزنون حسب sub (البريد) لتجنب find_one في كل طلب
+principal_cache = TieredCache([MemoryCacheBackend(settings.PRINCIPAL_CACHE_MAX_ENTRIES)], settings.PRINCIPAL_CACHE_TTL_SECONDS)
+# لا نحتفظ بالبيانات الحساسة في الذاكرة؛ لا يستخدمها أي مسار يعتمد على get_current_user
+PRINCIPAL_PROJECTION = {"hashed_password": 0, "verification_token": 0}
+
+async def invalidate_principal(email: str):
+    # يجب استدعاؤها في كل مسار يعدل مستخدمًا (التحقق، كلمة المرور، البيانات الشخصية)
+    await principal_cache.delete(email)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -22,19 +33,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise HTTPException(status_code=401, detail="Invalid credential")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid credential")
+
+    user = await principal_cache.get(email)
+    if user is not None:
+        return user
         
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, PRINCIPAL_PROJECTION)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    await principal_cache.set(email, user)
     return user
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, background_tasks: BackgroundTasks):
-    existing_user = await db.users.find_one({"email": user.email})
+async def register(user: UserCreate):
+    # البريد يُخزن بأحرف صغيرة، فالتحقق يجب أن يتم على نفس الشكل
+    existing_user = await db.users.find_one({"email": user.email.lower()})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_dict = user.model_dump()
     user_dict["hashed_password"] = hashed_password
     del user_dict["password"]
@@ -48,7 +65,11 @@ async def register(user: UserCreate, background_tasks: BackgroundTasks):
     user_dict["verification_token"] = verification_token
     user_dict["is_verified"] = False
     
-    new_user = await db.users.insert_one(user_dict)
+    try:
+        new_user = await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # تسجيلان متزامنان بنفس البريد: الفهرس الفريد يرفض الثاني
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Send verification email
     verify_link = f"http://localhost:8000/api/auth/verify/{verification_token}"
@@ -57,7 +78,8 @@ async def register(user: UserCreate, background_tasks: BackgroundTasks):
     <p>Please click the link below to verify your account:</p>
     <a href="{verify_link}">Verify Email</a>
     """
-    background_tasks.add_task(send_email_background, user_dict["email"], "Verify your account", email_body)
+    # إدراج واحد في صندوق الصادر؛ الإرسال الفعلي يتم في مرسل البريد
+    await email_sender.enqueue(user_dict["email"], "Verify your account", email_body)
 
     created_user = await db.users.find_one({"_id": new_user.inserted_id})
     
@@ -76,7 +98,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
          # Try finding by email if username failed
         user = await db.users.find_one({"email": form_data.username})
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await verify_password_async(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
@@ -106,4 +128,5 @@ async def verify_email(token: str):
         {"_id": user["_id"]},
         {"$set": {"is_verified": True, "verification_token": None}}
     )
+    await invalidate_principal(user["email"])
     return {"message": "Email verified successfully. You can now login."}
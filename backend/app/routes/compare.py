@@ -1,147 +1,239 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from datetime import datetime, timezone
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
+import asyncio
 import json
 from app.database import db
 from bson import ObjectId
-from groq import AsyncGroq
+from app.comparison import build_comparison_table, quick_verdict
 from app.config import settings
+from app.facilities import facility_labels
+from app.llm import llm_client
+from app.metrics import AI_FALLBACKS
+from app.repository import hostel_repository
 from app.routes.auth import get_current_user
+from app.utils.cache import LLMCache, llm_cache
+from app.utils.jsonstream import JSONStreamParser
+from app.utils.pagination import NEXT_CURSOR_HEADER, fetch_page
+from app.utils.singleflight import llm_flight
+from app.utils.writebehind import comparison_writer
+from app.utils.sse import sse_event, sse_response
 
 router = APIRouter()
 
+MIN_HOSTELS = 2
+MAX_HOSTELS = 6
+# الأحدث أولاً، مطابق لفهرس hcp_comparisons_user_created
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+HISTORY_PAGE_SIZE = 10
+MAX_HISTORY_PAGE_SIZE = 50
+
 class CompareRequest(BaseModel):
     hostel_ids: List[str]
+    # fast: جدول ونتيجة محسوبة محليًا بدون استدعاء الذكاء الاصطناعي
+    mode: Literal["full", "fast"] = "full"
 
 class CompareResponse(BaseModel):
+    # معرف المقارنة المحفوظة (لا يوجد في الردود الاحتياطية التي لا تُحفظ)
+    id: Optional[str] = None
     recommendation: str
     analysis: str
     comparison_table: List[Dict[str, Any]] = []
     hostel_names: List[str] = []
 
-@router.post("/", response_model=CompareResponse)
-async def compare_hostels(request: CompareRequest, current_user: dict = Depends(get_current_user)):
-    if len(request.hostel_ids) != 2:
-        raise HTTPException(status_code=400, detail="Please select exactly two hostels to compare.")
-    
-    # جلب بيوت الشباب
-    hostel1 = await db.hostels.find_one({"_id": ObjectId(request.hostel_ids[0])})
-    hostel2 = await db.hostels.find_one({"_id": ObjectId(request.hostel_ids[1])})
-    
-    if not hostel1 or not hostel2:
-        raise HTTPException(status_code=404, detail="One or both hostels not found.")
-        
-    # بناء موجه الذكاء الاصطناعي
-    prompt = f"""
-    You are an AI travel assistant specializing in hostels. Compare the following two hostels.
+class UnparsableCompletion(Exception):
+    def __init__(self, content: str):
+        super().__init__("Failed to parse JSON response")
+        self.content = content
 
-    Hostel 1: {hostel1.get('name')}
-    Data:
-    - Price: ${hostel1.get('price_per_night')}
-    - Rating: {hostel1.get('rating')}/10
-    - Facilities: {', '.join(hostel1.get('facilities', []))}
-    - Description: {hostel1.get('description')}
+async def _load_hostels(request: CompareRequest) -> List[dict]:
+    ids = request.hostel_ids
+    if not MIN_HOSTELS <= len(ids) <= MAX_HOSTELS:
+        raise HTTPException(status_code=400, detail=f"Please select between {MIN_HOSTELS} and {MAX_HOSTELS} hostels to compare.")
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Please select different hostels to compare.")
+    if not all(ObjectId.is_valid(i) for i in ids):
+        raise HTTPException(status_code=400, detail="Invalid ID")
 
-    Hostel 2: {hostel2.get('name')}
+    # من المستودع (استعلام $in واحد لما ليس في الذاكرة) ثم إعادة ترتيبها حسب الطلب
+    found = await hostel_repository.get_many([ObjectId(i) for i in ids])
+    if len(found) != len(ids):
+        raise HTTPException(status_code=404, detail="One or more hostels not found.")
+    return [found[ObjectId(i)] for i in ids]
+
+def build_compare_messages(hostels: List[dict]) -> List[Dict[str, str]]:
+    # الجدول يُحسب محليًا، لذلك نطلب من النموذج النص السردي فقط
+    # الترتيب حسب _id حتى تشترك (A,B) و (B,A) في نفس مدخل الذاكرة المؤقتة
+    ordered = sorted(hostels, key=lambda h: str(h["_id"]))
+    sections = "\n".join(
+        f"""
+    Hostel {i}: {h.get('name')}
     Data:
-    - Price: ${hostel2.get('price_per_night')}
-    - Rating: {hostel2.get('rating')}/10
-    - Facilities: {', '.join(hostel2.get('facilities', []))}
-    - Description: {hostel2.get('description')}
+    - Price: ${h.get('price_per_night')}
+    - Rating: {h.get('rating')}/10
+    - Facilities: {', '.join(facility_labels(h))}
+    - Description: {h.get('description')}
+"""
+        for i, h in enumerate(ordered, start=1)
+    )
 
+    # بناء موجه الذكاء الاصطناعي
+    prompt = f"""
+    You are an AI travel assistant specializing in hostels. Compare the following {len(ordered)} hostels.
+{sections}
     Please provide a comparison in STRICT JSON format with the following structure:
     {{
-        "recommendation": "A short summary recommendation statement.",
-        "comparison_table": [
-            {{
-                "feature": "Name of feature or advantage (e.g., 'Cheaper Price', 'Better Rating', 'Free Wifi')",
-                "hostel1_has": true/false (true if Hotel 1 is better or has the feature),
-                "hostel2_has": true/false (true if Hotel 2 is better or has the feature),
-                "details": "Short explanation (e.g., '$50 vs $75')"
-            }}
-        ],
+        "recommendation": "A short summary recommendation statement naming the best choice.",
         "detailed_analysis": "A detailed text analysis explaining the differences."
     }}
-    Create at least 5-6 comparison points covering Price, Rating, Cleanliness, Location (infer), Facilities, and Atmosphere.
+    Cover Price, Rating, Cleanliness, Location (infer), Facilities, and Atmosphere. Refer to hostels by name, not by number.
     Ensure strict JSON output. Do not include markdown code blocks (```json) or introductory text. Just the JSON string.
     """
-    
-    try:
-        # تهيئة عميل Groq
-        client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-        
-        chat_completion = await client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that outputs strict JSON.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            response_format={"type": "json_object"},
-        )
-        
-        analysis_json = chat_completion.choices[0].message.content
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that outputs strict JSON.",
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+
+def _fallback_response(hostels: List[dict], table: List[dict], error_msg: str) -> CompareResponse:
+    # احتياطي: النتيجة المحلية نفسها مع توضيح أن الذكاء الاصطناعي غير متاح
+    AI_FALLBACKS.labels("compare").inc()
+    _, analysis = quick_verdict(hostels)
+    return CompareResponse(
+        recommendation="AI Unavailable",
+        analysis=f"(Unable to connect to AI Service. Error: {error_msg})\n\n**Comparison Analysis (Fallback):**\n\n{analysis}",
+        comparison_table=table,
+        hostel_names=[h["name"] for h in hostels]
+    )
+
+async def _save_comparison(current_user: dict, hostels: List[dict], recommendation: str, analysis: str,
+                           table: List[dict], mode: str) -> CompareResponse:
+    # الحفظ في قاعدة البيانات
+    comparison_doc = {
+        "user_id": current_user["_id"],
+        "hostel_ids": [h["_id"] for h in hostels],
+        "hostel_names": [h["name"] for h in hostels],
+        "recommendation": recommendation,
+        "analysis": analysis,
+        "comparison_table": table,
+        "mode": mode,
+        "created_at": datetime.utcnow()
+    }
+    # الكتابة في الخلفية: المعرف يُنشأ هنا فيمكن فتح /compare/{id} فورًا
+    comparison_id = await comparison_writer.add(comparison_doc)
+
+    return CompareResponse(
+        id=str(comparison_id),
+        recommendation=recommendation,
+        analysis=analysis,
+        comparison_table=table,
+        hostel_names=comparison_doc["hostel_names"]
+    )
+
+@router.post("/", response_model=CompareResponse)
+async def compare_hostels(request: CompareRequest, current_user: dict = Depends(get_current_user)):
+    hostels = await _load_hostels(request)
+    table = build_comparison_table(hostels)
+
+    if request.mode == "fast":
+        recommendation, analysis = quick_verdict(hostels)
+        return await _save_comparison(current_user, hostels, recommendation, analysis, table, request.mode)
+
+    messages = build_compare_messages(hostels)
+    cache_key = LLMCache.make_key("compare", settings.GROQ_MODEL, messages)
+    data = await llm_cache.get(cache_key)
+
+    async def generate():
+        analysis_json = await llm_client.complete(messages, response_format={"type": "json_object"})
         
         try:
             data = json.loads(analysis_json)
-            recommendation = data.get("recommendation", "Check analysis details.")
-            detailed_analysis = data.get("detailed_analysis", "")
-            comparison_table = data.get("comparison_table", [])
-            
-            # الحفظ في قاعدة البيانات
-            comparison_doc = {
-                "user_id": current_user["_id"],
-                "hostel_ids": [hostel1["_id"], hostel2["_id"]],
-                "hostel_names": [hostel1["name"], hostel2["name"]],
-                "recommendation": recommendation,
-                "analysis": detailed_analysis,
-                "comparison_table": comparison_table,
-                "created_at": datetime.utcnow()
-            }
-            await db.comparisons.insert_one(comparison_doc)
-
-            return CompareResponse(
-                recommendation=recommendation, 
-                analysis=detailed_analysis,
-                comparison_table=comparison_table,
-                hostel_names=[hostel1["name"], hostel2["name"]]
-            )
         except json.JSONDecodeError:
+            raise UnparsableCompletion(analysis_json)
+        if not isinstance(data, dict):
+            raise UnparsableCompletion(analysis_json)
+        await llm_cache.set(cache_key, data)
+        return data
+
+    if data is None:
+        try:
+            # الطلبات المتزامنة لنفس المجموعة تنتظر استدعاء Groq واحدًا
+            data = await llm_flight.do(cache_key, generate)
+        except UnparsableCompletion as e:
             print("Failed to parse JSON response")
+            AI_FALLBACKS.labels("compare_unparsable").inc()
             return CompareResponse(
                 recommendation="Analysis Available", 
-                analysis=analysis_json,
-                comparison_table=[]
+                analysis=e.content,
+                comparison_table=table,
+                hostel_names=[h["name"] for h in hostels]
             )
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        error_msg = str(e)
-        print(f"AI Error Detailed: {error_msg}")
-        
-        # استجابة وهمية احتياطية
-        mock_analysis = f"""
-        (Unable to connect to AI Service. Error: {error_msg})
-        
-        **Comparison Analysis (Fallback):**
-        
-        **Price:** {hostel1.get('name')} is priced at ${hostel1.get('price_per_night')}, while {hostel2.get('name')} is ${hostel2.get('price_per_night')}. 
-        
-        **Rating:** {hostel1.get('name')} has a rating of {hostel1.get('rating')}, whereas {hostel2.get('name')} has {hostel2.get('rating')}.
-        """
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"AI Error Detailed: {e}")
+            return _fallback_response(hostels, table, str(e))
+
+    return await _save_comparison(
+        current_user, hostels,
+        data.get("recommendation", "Check analysis details."),
+        data.get("detailed_analysis", ""),
+        table, request.mode
+    )
+
+@router.post("/stream")
+async def compare_hostels_stream(request: CompareRequest, current_user: dict = Depends(get_current_user)):
+    # نسخة SSE: حدث row لكل صف من الجدول المحلي، ثم recommendation و analysis عند توليدهما،
+    # ثم done بالاستجابة الكاملة بعد الحفظ؛ عند الفشل error بالاستجابة الاحتياطية
+    hostels = await _load_hostels(request)
+    table = build_comparison_table(hostels)
+    messages = build_compare_messages(hostels)
+    cache_key = LLMCache.make_key("compare", settings.GROQ_MODEL, messages)
+
+    async def event_stream():
+        for row in table:
+            yield sse_event("row", row)
 
-        return CompareResponse(
-            recommendation="AI Unavailable", 
-            analysis=mock_analysis,
-            comparison_table=[]
+        if request.mode == "fast":
+            data = dict(zip(("recommendation", "detailed_analysis"), quick_verdict(hostels)))
+        else:
+            data = await llm_cache.get(cache_key)
+
+        if data is not None:
+            yield sse_event("recommendation", {"recommendation": data.get("recommendation", "Check analysis details.")})
+            yield sse_event("analysis", {"analysis": data.get("detailed_analysis", "")})
+        else:
+            parser = JSONStreamParser()
+            try:
+                async for delta in llm_client.stream(messages):
+                    for kind, key, value in parser.feed(delta):
+                        if kind == "field" and key == "recommendation":
+                            yield sse_event("recommendation", {"recommendation": value})
+                        elif kind == "field" and key == "detailed_analysis":
+                            yield sse_event("analysis", {"analysis": value})
+                data = parser.result()
+            except Exception as e:
+                print(f"AI Stream Error: {e}")
+                yield sse_event("error", _fallback_response(hostels, table, str(e)).model_dump())
+                return
+            await llm_cache.set(cache_key, data)
+
+        response = await _save_comparison(
+            current_user, hostels,
+            data.get("recommendation", "Check analysis details."),
+            data.get("detailed_analysis", ""),
+            table, request.mode
         )
+        yield sse_event("done", response.model_dump())
+
+    return sse_response(event_stream())
 
 class ComparisonHistoryItem(BaseModel):
     id: str
@@ -149,11 +241,23 @@ class ComparisonHistoryItem(BaseModel):
     recommendation: str
     created_at: datetime
 
+class ComparisonCount(BaseModel):
+    count: int
+
+# حقول السجل فقط؛ التحليل وجدول المقارنة كبيران ولا يُعرضان في القائمة
+HISTORY_PROJECTION = {"hostel_names": 1, "recommendation": 1, "created_at": 1}
+
 @router.get("/history", response_model=List[ComparisonHistoryItem])
-async def get_comparison_history(current_user: dict = Depends(get_current_user)):
-    cursor = db.comparisons.find({"user_id": current_user["_id"]}).sort("created_at", -1).limit(10)
-    history = await cursor.to_list(length=10)
-    
+async def get_comparison_history(response: Response, before: Optional[str] = None,
+                                 limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+                                 current_user: dict = Depends(get_current_user)):
+    # before= هو X-Next-Cursor من الصفحة السابقة؛ كل صفحة مسح فهرس بطول limit مهما كان عمقها
+    history, next_cursor = await fetch_page(
+        db.comparisons, {"user_id": current_user["_id"]}, HISTORY_SORT, limit, before, HISTORY_PROJECTION
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
     return [
         ComparisonHistoryItem(
             id=str(item["_id"]),
@@ -164,20 +268,38 @@ async def get_comparison_history(current_user: dict = Depends(get_current_user))
         for item in history
     ]
 
+@router.get("/history/count", response_model=ComparisonCount)
+async def count_comparison_history(current_user: dict = Depends(get_current_user)):
+    # عدّ على مفاتيح الفهرس فقط، دون قراءة المستندات
+    return ComparisonCount(count=await db.comparisons.count_documents({"user_id": current_user["_id"]}))
+
+async def _find_comparison(comparison_id: ObjectId, current_user: dict):
+    # ما زالت في طابور الكتابة في هذا العامل
+    pending = comparison_writer.get(comparison_id)
+    if pending is not None:
+        return pending if pending["user_id"] == current_user["_id"] else None
+
+    query = {"_id": comparison_id, "user_id": current_user["_id"]}
+    comparison = await db.comparisons.find_one(query)
+    if comparison is None:
+        # أُنشئت للتو في طابور عامل آخر: المعرف يحمل وقت إنشائه، فننتظر دفعة واحدة ثم نعيد المحاولة
+        age = (datetime.now(timezone.utc) - comparison_id.generation_time).total_seconds()
+        if 0 <= age < settings.COMPARISON_FLUSH_SECONDS * 2:
+            await asyncio.sleep(settings.COMPARISON_FLUSH_SECONDS)
+            comparison = await db.comparisons.find_one(query)
+    return comparison
+
 @router.get("/{id}", response_model=CompareResponse)
 async def get_comparison_detail(id: str, current_user: dict = Depends(get_current_user)):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
         
-    comparison = await db.comparisons.find_one({
-        "_id": ObjectId(id),
-        "user_id": current_user["_id"]
-    })
-    
+    comparison = await _find_comparison(ObjectId(id), current_user)
     if not comparison:
         raise HTTPException(status_code=404, detail="Comparison not found")
         
     return CompareResponse(
+        id=id,
         recommendation=comparison.get("recommendation", ""),
         analysis=comparison.get("analysis", ""),
         comparison_table=comparison.get("comparison_table", []),
@@ -189,8 +311,15 @@ async def delete_comparison(id: str, current_user: dict = Depends(get_current_us
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
         
+    comparison_id = ObjectId(id)
+    pending = comparison_writer.get(comparison_id)
+    if pending is not None and pending["user_id"] == current_user["_id"] and comparison_writer.discard(comparison_id):
+        # لم تُكتب بعد: يكفي حذفها من الطابور
+        return {"message": "Comparison deleted successfully"}
+    await comparison_writer.wait_in_flight(comparison_id)
+
     result = await db.comparisons.delete_one({
-        "_id": ObjectId(id),
+        "_id": comparison_id,
         "user_id": current_user["_id"]
     })
     
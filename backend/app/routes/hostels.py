@@ -1,19 +1,47 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from app.catalogue import cache_headers, catalogue_etag, catalogue_version
 from app.database import db
-from app.models.hostel import HostelDB, HostelCreate, HostelResponse
+from app.facets import compute_facets, get_facet_summary, refresh_facet_summary
+from app.facilities import canonical_fields, parse_facility_filter
+from app.geo import MAX_NEAR_RESULTS, MAX_RADIUS_KM, build_near_pipeline, geocode
+from app.models.hostel import HostelDB, HostelCreate, HostelResponse, HostelSummary, HostelFacets, NearbyHostel, SimilarHostel, Suggestions
+from app.repository import hostel_repository
+from app.similar import MAX_SIMILAR, similarity_index
+from app.suggest import MAX_SUGGESTIONS, suggestion_index
+from app.utils.pagination import NEXT_CURSOR_HEADER, fetch_page
+from app.utils.serialize import DocumentEncoder, ORJSONResponse
+from app.utils.text import fold, prefix_pattern
 from bson import ObjectId
 
 router = APIRouter()
 
-@router.get("/", response_model=List[HostelResponse])
-async def get_hostels(search: str = None, country: str = None, min_price: float = None, max_price: float = None, min_rating: float = None):
+# ترتيب ثابت للترقيم: الأعلى تقييمًا أولاً، و _id لكسر التعادل
+HOSTEL_SORT = [("rating", -1), ("_id", -1)]
+MAX_PAGE_SIZE = 100
+# المستندات تُحوَّل إلى JSON مباشرة بدلاً من التحقق منها عبر response_model (انظر app/utils/serialize.py)
+hostel_encoder = DocumentEncoder(HostelResponse)
+summary_encoder = DocumentEncoder(HostelSummary)
+nearby_encoder = DocumentEncoder(NearbyHostel)
+similar_encoder = DocumentEncoder(SimilarHostel)
+SUMMARY_PROJECTION = summary_encoder.projection
+
+def parse_facilities(facilities: Optional[str]) -> List[str]:
+    if not facilities:
+        return []
+    try:
+        return parse_facility_filter(facilities)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown facility: {e}")
+
+def build_hostel_query(search: str = None, country: str = None, min_price: float = None, max_price: float = None, min_rating: float = None,
+                       facilities: List[str] = None) -> dict:
     query = {}
     if country:
         query["country"] = country
     if search:
-        # بحث regex غير حساس لحالة الأحرف في الاسم
-        query["name"] = {"$regex": search, "$options": "i"}
+        # بحث بادئة مثبتة على name_lower حتى يُستخدم الفهرس بدلاً من مسح المجموعة
+        query["name_lower"] = {"$regex": prefix_pattern(search)}
     
     if min_price is not None or max_price is not None:
         query["price_per_night"] = {}
@@ -24,32 +52,104 @@ async def get_hostels(search: str = None, country: str = None, min_price: float
             
     if min_rating is not None:
         query["rating"] = {"$gte": min_rating}
+    if facilities:
+        # مطابقة على مصفوفة الرموز الموحدة المفهرسة بدلاً من regex على النص الحر
+        query["facility_codes"] = {"$all": facilities}
+    return query
 
+def _page_headers(etag: str, next_cursor: Optional[str]) -> dict:
+    # الاستجابة تُعاد مباشرة، فرؤوس معامل Response لا تُدمج معها
+    headers = cache_headers(etag)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return headers
+
+def _page_limit(limit: Optional[int], query: dict) -> int:
+    if limit is not None:
+        return limit
     # إذا كان البحث/التصفية نشطًا، قد نحتاج لمزيد من النتائج، لكن لنضع الحد الأقصى عند 50 للأمان
     # إذا لم يكن هناك بحث، أعد فقط أفضل 20 لتجنب التحميل الزائد
-    limit = 50 if search or country or min_price or max_price or min_rating else 20
-    
-    hostels = await db.hostels.find(query).to_list(limit)
-    
-    output = []
-    for h in hostels:
-        h_dict = h
-        if "_id" in h_dict:
-            h_dict["id"] = str(h_dict["_id"])
-        output.append(h_dict)
-    return output
+    return 50 if query else 20
+
+@router.get("/", response_model=List[HostelResponse])
+async def get_hostels(search: str = None, country: str = None, min_price: float = None, max_price: float = None, min_rating: float = None, facilities: str = None,
+                      cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), etag: str = Depends(catalogue_etag)):
+    query = build_hostel_query(search, country, min_price, max_price, min_rating, parse_facilities(facilities))
+    # الإسقاط يجلب حقول الاستجابة فقط (بدون name_lower و source_key و content_hash...)
+    hostels, next_cursor = await fetch_page(db.hostels, query, HOSTEL_SORT, _page_limit(limit, query), cursor, hostel_encoder.projection)
+    return hostel_encoder.list_response(hostels, headers=_page_headers(etag, next_cursor))
+
+@router.get("/summary", response_model=List[HostelSummary])
+async def get_hostel_summaries(search: str = None, country: str = None, min_price: float = None, max_price: float = None, min_rating: float = None, facilities: str = None,
+                               cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), etag: str = Depends(catalogue_etag)):
+    # نفس فلاتر get_hostels لكن مع إسقاط الحقول الكبيرة (الوصف، المعالم...) لقوائم الاختيار
+    query = build_hostel_query(search, country, min_price, max_price, min_rating, parse_facilities(facilities))
+    hostels, next_cursor = await fetch_page(db.hostels, query, HOSTEL_SORT, _page_limit(limit, query), cursor, SUMMARY_PROJECTION)
+    return summary_encoder.list_response(hostels, headers=_page_headers(etag, next_cursor))
+
+@router.get("/facets", response_model=HostelFacets)
+async def get_hostel_facets(response: Response, search: str = None, country: str = None, min_price: float = None, max_price: float = None, min_rating: float = None,
+                            facilities: str = None, etag: str = Depends(catalogue_etag)):
+    response.headers.update(cache_headers(etag))
+    query = build_hostel_query(search, country, min_price, max_price, min_rating, parse_facilities(facilities))
+    if not query:
+        # بدون فلاتر: الملخص المحسوب مسبقًا (قراءة واحدة بدون تجميع)
+        return await get_facet_summary(db)
+    return await compute_facets(db, query)
+
+@router.get("/near", response_model=List[NearbyHostel])
+async def get_nearby_hostels(lat: float = Query(..., ge=-90, le=90), lng: float = Query(..., ge=-180, le=180),
+                             radius: float = Query(5, gt=0, le=MAX_RADIUS_KM, description="Radius in kilometres"),
+                             min_price: float = None, max_price: float = None, min_rating: float = None, facilities: str = None,
+                             limit: int = Query(20, ge=1, le=MAX_NEAR_RESULTS), etag: str = Depends(catalogue_etag)):
+    # الأقرب أولاً؛ نصف القطر والحد الأقصى للنتائج محدودان حتى لا يصبح الطلب مسحًا لمدينة كاملة
+    query = build_hostel_query(None, None, min_price, max_price, min_rating, parse_facilities(facilities))
+    pipeline = build_near_pipeline(lat, lng, radius, query, limit, SUMMARY_PROJECTION)
+    hostels = await db.hostels.aggregate(pipeline).to_list(limit)
+    return ORJSONResponse([nearby_encoder.shape(h, distance_km=round(h["distance_m"] / 1000, 3)) for h in hostels], headers=cache_headers(etag))
+
+@router.get("/suggest", response_model=Suggestions)
+async def suggest_hostels(q: str = "", limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS)):
+    # يُخدم بالكامل من الذاكرة؛ لا يلمس MongoDB
+    return suggestion_index.suggest(q, limit)
 
 @router.post("/", response_model=HostelResponse)
 async def create_hostel(hostel: HostelCreate):
-    new_hostel = await db.hostels.insert_one(hostel.model_dump())
-    created_hostel = await db.hostels.find_one({"_id": new_hostel.inserted_id})
-    return HostelResponse(**created_hostel, id=str(created_hostel["_id"]))
+    hostel_doc = hostel.model_dump()
+    hostel_doc["name_lower"] = fold(hostel_doc["name"])
+    hostel_doc.update(canonical_fields(hostel_doc["facilities"]))
+    hostel_doc.update(geocode(hostel_doc))
+    new_hostel = await db.hostels.insert_one(hostel_doc)
+    # الملخص قبل رفع الإصدار: وإلا يأخذ طلب /facets بينهما الوسم الجديد مع الملخص القديم ويبقى عليه بـ 304
+    await refresh_facet_summary(db)
+    # قبل الرد حتى لا يحصل العميل على 304 لقائمة لا تحتوي الفندق الجديد
+    version = await catalogue_version.bump(db)
+    hostel_repository.invalidate([new_hostel.inserted_id])
+    created_hostel = await hostel_repository.get(new_hostel.inserted_id)
+    # الفهرسان يطبقان الفندق بنفسيهما ويسجلان الإصدار، فلا يعيد rebuild_on_change تحميل الكتالوج كله
+    suggestion_index.add_hostel(created_hostel, version)
+    similarity_index.add_hostel(created_hostel, version)
+    return hostel_encoder.response(created_hostel)
+
+@router.get("/{hostel_id}/similar", response_model=List[SimilarHostel])
+async def get_similar_hostels(hostel_id: str, k: int = Query(10, ge=1, le=MAX_SIMILAR)):
+    if not ObjectId.is_valid(hostel_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    hostel = await hostel_repository.get(ObjectId(hostel_id))
+    if not hostel:
+        raise HTTPException(status_code=404, detail="Hostel not found")
+
+    # الترتيب من المصفوفة في الذاكرة، ثم المستندات من المستودع (استعلام $in واحد لما ليس في الذاكرة)
+    scored = similarity_index.similar(hostel, k)
+    docs = await hostel_repository.get_many([ObjectId(i) for i, _ in scored])
+    by_id = {str(hostel_id): d for hostel_id, d in docs.items()}
+    return ORJSONResponse([similar_encoder.shape(by_id[i], similarity=round(score, 4)) for i, score in scored if i in by_id])
 
 @router.get("/{hostel_id}", response_model=HostelResponse)
-async def get_hostel(hostel_id: str):
+async def get_hostel(hostel_id: str, etag: str = Depends(catalogue_etag)):
     if not ObjectId.is_valid(hostel_id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    hostel = await db.hostels.find_one({"_id": ObjectId(hostel_id)})
+    hostel = await hostel_repository.get(ObjectId(hostel_id))
     if not hostel:
         raise HTTPException(status_code=404, detail="Hostel not found")
-    return HostelResponse(**hostel, id=str(hostel["_id"]))
+    return hostel_encoder.response(hostel, headers=cache_headers(etag))
@@ -0,0 +1,107 @@
+# مصفوفة خصائص في الذاكرة لـ "فنادق مشابهة": صف float32 مطبع لكل فندق (السعر والتقييم والمرافق)
+# مجمعة حسب (الدولة، المدينة)؛ الاستعلام ضرب مصفوفة في متجه ثم argpartition لأفضل k
+from typing import Dict, List, Tuple
+import numpy as np
+from app.catalogue import LocalVersions
+from app.facilities import FACILITY_CODES, canonical_facilities, facility_mask
+from app.utils.text import fold
+
+MAX_SIMILAR = 20
+# وزن السعر والتقييم مقابل المرافق في المتجه
+PRICE_WEIGHT = 1.5
+RATING_WEIGHT = 1.5
+MIN_GROUP_SIZE = 5
+
+def _mask(doc: dict) -> int:
+    mask = doc.get("facility_mask")
+    return mask if mask is not None else facility_mask(canonical_facilities(doc.get("facilities")))
+
+class SimilarityIndex:
+    def __init__(self):
+        self.matrix = np.zeros((0, 2), dtype=np.float32)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.city_groups: Dict[Tuple[str, str], np.ndarray] = {}
+        self.country_groups: Dict[str, np.ndarray] = {}
+        self.price_stats = (0.0, 1.0)
+        self.rating_stats = (0.0, 1.0)
+        self.local_versions = LocalVersions()
+
+    def _encode(self, docs: List[dict]) -> np.ndarray:
+        prices = np.log1p(np.array([float(d.get("price_per_night") or 0) for d in docs], dtype=np.float32))
+        ratings = np.array([float(d.get("rating") or 0) for d in docs], dtype=np.float32)
+        masks = np.array([_mask(d) for d in docs], dtype=np.int64)
+        features = np.zeros((len(docs), 2 + len(FACILITY_CODES)), dtype=np.float32)
+        features[:, 0] = PRICE_WEIGHT * (prices - self.price_stats[0]) / self.price_stats[1]
+        features[:, 1] = RATING_WEIGHT * (ratings - self.rating_stats[0]) / self.rating_stats[1]
+        facilities = ((masks[:, None] >> np.arange(len(FACILITY_CODES))) & 1).astype(np.float32)
+        # كل فندق يساهم بنفس الوزن الكلي للمرافق بغض النظر عن عددها
+        counts = facilities.sum(axis=1, keepdims=True)
+        features[:, 2:] = facilities / np.sqrt(np.maximum(counts, 1))
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return features / np.maximum(norms, 1e-6)
+
+    async def build(self, db):
+        docs = await db.hostels.find(
+            {}, {"country": 1, "city": 1, "price_per_night": 1, "rating": 1, "facilities": 1, "facility_mask": 1}
+        ).to_list(None)
+
+        prices = np.log1p(np.array([float(d.get("price_per_night") or 0) for d in docs], dtype=np.float32))
+        ratings = np.array([float(d.get("rating") or 0) for d in docs], dtype=np.float32)
+
+        fresh = SimilarityIndex()
+        if docs:
+            fresh.price_stats = (float(prices.mean()), float(prices.std()) or 1.0)
+            fresh.rating_stats = (float(ratings.mean()), float(ratings.std()) or 1.0)
+        fresh.matrix = fresh._encode(docs)
+        fresh.ids = [str(d["_id"]) for d in docs]
+        fresh.rows = {hostel_id: i for i, hostel_id in enumerate(fresh.ids)}
+
+        city_groups: Dict[Tuple[str, str], List[int]] = {}
+        country_groups: Dict[str, List[int]] = {}
+        for i, d in enumerate(docs):
+            city_groups.setdefault((d.get("country"), fold(d.get("city"))), []).append(i)
+            country_groups.setdefault(d.get("country"), []).append(i)
+        fresh.city_groups = {k: np.array(v, dtype=np.int64) for k, v in city_groups.items()}
+        fresh.country_groups = {k: np.array(v, dtype=np.int64) for k, v in country_groups.items()}
+        # سجل الإصدارات المحلية يبقى نفسه عبر عمليات البناء (rebuild_on_change يحمل مرجعًا إليه)
+        fresh.local_versions = self.local_versions
+
+        # تبديل الحالة دفعة واحدة
+        self.__dict__.update(fresh.__dict__)
+        print(f"Similarity index built: {len(self.ids)} hostels")
+
+    def add_hostel(self, doc: dict, version: int):
+        row = len(self.ids)
+        hostel_id = str(doc["_id"])
+        self.matrix = np.vstack([self.matrix, self._encode([doc])]) if len(self.ids) else self._encode([doc])
+        self.ids.append(hostel_id)
+        self.rows[hostel_id] = row
+        city_key = (doc.get("country"), fold(doc.get("city")))
+        self.city_groups[city_key] = np.append(self.city_groups.get(city_key, np.zeros(0, dtype=np.int64)), row)
+        self.country_groups[doc.get("country")] = np.append(self.country_groups.get(doc.get("country"), np.zeros(0, dtype=np.int64)), row)
+        self.local_versions.add(version)
+
+    def similar(self, doc: dict, k: int = 10) -> List[Tuple[str, float]]:
+        hostel_id = str(doc["_id"])
+        row = self.rows.get(hostel_id)
+        vector = self.matrix[row] if row is not None else self._encode([doc])[0]
+
+        candidates = self.city_groups.get((doc.get("country"), fold(doc.get("city"))))
+        if candidates is None or len(candidates) <= MIN_GROUP_SIZE:
+            # المدينة صغيرة جدًا: نوسع البحث إلى الدولة
+            candidates = self.country_groups.get(doc.get("country"))
+        if candidates is None or not len(candidates):
+            return []
+        if row is not None:
+            candidates = candidates[candidates != row]
+
+        scores = self.matrix[candidates] @ vector
+        k = min(k, len(candidates))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+
+similarity_index = SimilarityIndex()
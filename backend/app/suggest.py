@@ -0,0 +1,144 @@
+# فهرس اقتراحات في الذاكرة لأسماء الفنادق والمدن: مفاتيح مطوية في مصفوفات مرتبة يُبحث فيها بـ bisect
+# البادئات القصيرة (حتى TABLE_PREFIX_LEN) لها قوائم أفضل تقييم محسوبة مسبقًا، والأطول تُرتب عند الطلب
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+from app.catalogue import LocalVersions
+from app.utils.text import fold
+
+MAX_SUGGESTIONS = 20
+TABLE_PREFIX_LEN = 3
+_HIGH = "\U0010ffff"
+
+class _SortedKeys:
+    """Parallel sorted key/ref arrays."""
+
+    def __init__(self, pairs: List[Tuple[str, int]] = ()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.refs = [ref for _, ref in pairs]
+
+    def add(self, key: str, ref: int):
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.refs.insert(i, ref)
+
+    def prefix_refs(self, prefix: str) -> List[int]:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _HIGH, lo)
+        return self.refs[lo:hi]
+
+def _name_keys(name: str) -> List[str]:
+    # كل كلمة في الاسم بداية محتملة للبحث
+    words = fold(name).split()
+    return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+def _short_prefixes(keys: List[str]) -> set:
+    return {key[:n] for key in keys for n in range(1, min(len(key), TABLE_PREFIX_LEN) + 1)}
+
+def _best_refs(refs: List[int], limit: int) -> List[int]:
+    # المرجع الأصغر = تقييم أعلى؛ الفندق قد يطابق بأكثر من كلمة، فنسحب حتى نجمع limit مراجع مختلفة
+    heapq.heapify(refs)
+    best = []
+    while refs and len(best) < limit:
+        ref = heapq.heappop(refs)
+        if not best or best[-1] != ref:
+            best.append(ref)
+    return best
+
+class SuggestionIndex:
+    def __init__(self):
+        self.hostels: List[dict] = []
+        self.hostel_keys = _SortedKeys()
+        self.added_keys = _SortedKeys()
+        self.top: Dict[str, List[int]] = {}
+        self.cities: List[dict] = []
+        self.city_refs: Dict[Tuple[str, str], int] = {}
+        self.city_keys = _SortedKeys()
+        self.ready = False
+        self.local_versions = LocalVersions()
+
+    def _hostel_entry(self, doc: dict) -> dict:
+        return {
+            "id": str(doc["_id"]),
+            "name": doc.get("name", ""),
+            "city": doc.get("city", ""),
+            "country": doc.get("country", ""),
+            "rating": float(doc.get("rating") or 0),
+        }
+
+    async def build(self, db):
+        hostels, cities, city_refs = [], [], {}
+        async for doc in db.hostels.find({}, {"name": 1, "city": 1, "country": 1, "rating": 1}):
+            hostels.append(self._hostel_entry(doc))
+        # الترتيب حسب التقييم أولاً يجعل أول MAX_SUGGESTIONS في كل جدول هي الأفضل
+        hostels.sort(key=lambda h: -h["rating"])
+
+        hostel_pairs, top = [], {}
+        for ref, hostel in enumerate(hostels):
+            keys = _name_keys(hostel["name"])
+            hostel_pairs.extend((key, ref) for key in keys)
+            for prefix in _short_prefixes(keys):
+                bucket = top.setdefault(prefix, [])
+                if len(bucket) < MAX_SUGGESTIONS:
+                    bucket.append(ref)
+
+            city_key = (fold(hostel["city"]), hostel["country"])
+            if city_key[0]:
+                if city_key not in city_refs:
+                    city_refs[city_key] = len(cities)
+                    cities.append({"city": hostel["city"], "country": hostel["country"], "count": 0})
+                cities[city_refs[city_key]]["count"] += 1
+
+        hostel_keys = _SortedKeys(hostel_pairs)
+        city_keys = _SortedKeys((key[0], ref) for key, ref in city_refs.items())
+        # تبديل كامل دون await بين الخطوات حتى لا يرى أي طلب فهرسًا نصف مبني
+        self.hostels, self.hostel_keys, self.top = hostels, hostel_keys, top
+        self.added_keys = _SortedKeys()
+        self.cities, self.city_refs, self.city_keys = cities, city_refs, city_keys
+        self.ready = True
+        print(f"Suggestion index built: {len(hostels)} hostels, {len(cities)} cities")
+
+    def add_hostel(self, doc: dict, version: int):
+        hostel = self._hostel_entry(doc)
+        ref = len(self.hostels)
+        self.hostels.append(hostel)
+        keys = _name_keys(hostel["name"])
+        for key in keys:
+            self.added_keys.add(key, ref)
+        for prefix in _short_prefixes(keys):
+            bucket = self.top.setdefault(prefix, [])
+            ratings = [-self.hostels[r]["rating"] for r in bucket]
+            bucket.insert(bisect_right(ratings, -hostel["rating"]), ref)
+            del bucket[MAX_SUGGESTIONS:]
+
+        city_key = (fold(hostel["city"]), hostel["country"])
+        if city_key[0]:
+            if city_key not in self.city_refs:
+                self.city_refs[city_key] = len(self.cities)
+                self.cities.append({"city": hostel["city"], "country": hostel["country"], "count": 0})
+                self.city_keys.add(city_key[0], self.city_refs[city_key])
+            self.cities[self.city_refs[city_key]]["count"] += 1
+        self.local_versions.add(version)
+
+    def suggest(self, q: str, limit: int = 10) -> dict:
+        prefix = fold(q)
+        if not prefix:
+            return {"hostels": [], "cities": []}
+
+        if len(prefix) <= TABLE_PREFIX_LEN:
+            hostel_refs = self.top.get(prefix, [])[:limit]
+        else:
+            built = _best_refs(self.hostel_keys.prefix_refs(prefix), limit)
+            added = self.added_keys.prefix_refs(prefix)
+            candidates = dict.fromkeys(built[:limit] + added)
+            hostel_refs = heapq.nlargest(limit, candidates, key=lambda r: self.hostels[r]["rating"])
+
+        city_candidates = self.city_keys.prefix_refs(prefix)
+        city_refs = heapq.nlargest(limit, city_candidates, key=lambda r: self.cities[r]["count"])
+        return {
+            "hostels": [self.hostels[r] for r in hostel_refs],
+            "cities": [self.cities[r] for r in city_refs],
+        }
+
+suggestion_index = SuggestionIndex()
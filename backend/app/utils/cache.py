@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+from app.config import settings
+from app.database import db
+
+class MemoryCacheBackend:
+    # LRU داخل العملية مع مدة صلاحية لكل مدخل
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Any, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+class MongoCacheBackend:
+    # ذاكرة في مجموعة Mongo يشترك فيها كل عمال uvicorn؛ فهرس TTL يحذف المنتهي،
+    # لكن القراءة تتحقق من expires_at أيضًا لأن مراقب TTL يعمل مرة في الدقيقة
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, key: str) -> Optional[Any]:
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Any, ttl: int):
+        now = datetime.utcnow()
+        await self.collection.replace_one(
+            {"_id": key},
+            {"_id": key, "value": value, "created_at": now, "expires_at": now + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+    async def clear(self):
+        await self.collection.delete_many({})
+
+class TieredCache:
+    # قراءة عبر عدة طبقات، الأسرع أولاً؛ الإصابة في طبقة أبطأ تُنسخ إلى الأسرع.
+    # أخطاء الطبقات تُسجل وتُعامل كإخفاق، فلا تُفشل الذاكرة أي طلب
+    def __init__(self, backends: List, ttl: int):
+        self.backends = backends
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        for i, backend in enumerate(self.backends):
+            try:
+                value = await backend.get(key)
+            except Exception as e:
+                print(f"Cache read error ({type(backend).__name__}): {e}")
+                continue
+            if value is not None:
+                self.hits += 1
+                for faster in self.backends[:i]:
+                    await faster.set(key, value, self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        for backend in self.backends:
+            try:
+                await backend.set(key, value, self.ttl)
+            except Exception as e:
+                print(f"Cache write error ({type(backend).__name__}): {e}")
+
+    async def delete(self, key: str):
+        for backend in self.backends:
+            try:
+                await backend.delete(key)
+            except Exception as e:
+                print(f"Cache delete error ({type(backend).__name__}): {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class LLMCache(TieredCache):
+    @staticmethod
+    def make_key(kind: str, model: str, messages: List[dict]) -> str:
+        # المفتاح يعتمد على المحتوى الفعلي للموجه، فتغيّر بيانات الفندق أو القالب يبطل المدخل تلقائيًا
+        payload = json.dumps({"kind": kind, "model": model, "messages": messages}, sort_keys=True, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+def _build_llm_cache() -> LLMCache:
+    backends = [MemoryCacheBackend(settings.LLM_CACHE_MAX_ENTRIES)]
+    if settings.LLM_CACHE_BACKEND == "mongo":
+        backends.append(MongoCacheBackend(db.llm_cache))
+    return LLMCache(backends, settings.LLM_CACHE_TTL_SECONDS)
+
+llm_cache = _build_llm_cache()
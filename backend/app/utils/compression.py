@@ -0,0 +1,98 @@
+# ضغط brotli/gzip للاستجابات الكاملة (JSON والنص) من COMPRESSION_MIN_BYTES فأكثر؛ البث يمر كما هو.
+# الوسم يحصل على اللاحقة -br أو -gzip حتى لا تشترك النسختان في وسم قوي واحد، و app/catalogue.py يزيلها عند المقارنة
+import gzip
+from typing import Optional
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 6
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        # q=0 يعني أن العميل يرفض هذا الترميز صراحة
+        if quality > 0:
+            accepted.add(name.strip())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match", "")
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if message["status"] == 304:
+                    # 304 بلا جسم، لكن المخازن الوسيطة تحتاج Vary والوسم نفسيهما اللذين حملتهما استجابة 200
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if encoding and etag and etag.endswith('"') and f'{etag[:-1]}-{encoding}"' in if_none_match:
+                        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+                    passthrough = True
+                    await send(message)
+                elif "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith("text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # ننتظر الجسم لنعرف حجمه قبل إرسال الرؤوس
+                    start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            passthrough = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None or message.get("more_body", False) or len(body) < self.minimum_size:
+                # بث أو جسم صغير أو عميل لا يقبل الضغط: يبقى Vary حتى لا تخلط المخازن الوسيطة بين النسختين
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,34 +1,208 @@
+# بريد المعاملات عبر صندوق صادر في Mongo: المسارات تدرج فقط، وحلقة المرسل في lifespan تطالب بالرسائل المستحقة
+# وترسلها عبر جلسة SMTP واحدة على خيط مخصص، مع إعادة محاولة متزايدة ومهلة مطالبة تسمح بعدة عمال.
+# للتجربة محليًا: python -m aiosmtpd -n -l localhost:8025 مع SMTP_SERVER=localhost و SMTP_PORT=8025 و SMTP_STARTTLS=false
+import asyncio
+import random
 import smtplib
-from email.mime.text import MIMEText
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+from pymongo import UpdateOne
 from app.config import settings
-import os
-
-def send_email_background(to_email: str, subject: str, body: str):
-    sender_email = os.getenv("SMTP_USER")
-    sender_password = os.getenv("SMTP_PASSWORD")
-    if not sender_email or not sender_password:
-        print("Email credentials not set. Skipping email sending.")
-        # Fallback to console print if credentials are missing
-        print(f"📧 [MOCK EMAIL] To: {to_email}\nSubject: {subject}\n{body}")
-        return
-
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'html'))
-
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-        print(f"Email sent to {to_email}")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+from app.database import db
+
+def build_message(sender: str, to_email: str, subject: str, body: str) -> str:
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg.as_string()
+
+def _is_permanent(error: Exception) -> bool:
+    # رفض دائم من الخادم (5xx) لن ينجح بإعادة المحاولة
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # خطأ في الإعدادات وليس في الرسالة؛ تبقى في الطابور حتى يُصلح
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+class SMTPSession:
+    """One reusable SMTP connection. Only ever used from the sender thread."""
+
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+
+    def connect(self):
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        try:
+            if settings.SMTP_STARTTLS:
+                server.starttls()
+            if settings.SMTP_PASSWORD:
+                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+    def _drop(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    def send_batch(self, messages: List[dict]) -> List[Optional[Exception]]:
+        """Send every message on the current connection; returns one error (or None) per message."""
+        results = []
+        for i, message in enumerate(messages):
+            payload = build_message(settings.SMTP_USER, message["to"], message["subject"], message["body"])
+            error = None
+            for attempt in range(2):
+                if self.server is None:
+                    try:
+                        self.connect()
+                    except Exception as e:
+                        # الخادم غير متاح: لا فائدة من المحاولة لبقية الدفعة الآن
+                        return results + [e] * (len(messages) - i)
+                try:
+                    self.server.sendmail(settings.SMTP_USER, message["to"], payload)
+                    error = None
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    # الخادم أغلق الاتصال الخامل؛ نعيد الاتصال مرة واحدة لنفس الرسالة
+                    self._drop()
+                    error = e
+                except smtplib.SMTPException as e:
+                    # رفض من الخادم لهذه الرسالة؛ الاتصال نفسه ما زال صالحًا
+                    error = e
+                    break
+                except OSError as e:
+                    self._drop()
+                    error = e
+            results.append(error)
+        return results
+
+class EmailSender:
+    def __init__(self, collection):
+        self.collection = collection
+        self.worker_id = uuid.uuid4().hex
+        self.session = SMTPSession()
+        # خيط واحد فقط: الجلسة ليست آمنة للاستخدام من عدة خيوط
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def enqueue(self, to_email: str, subject: str, body: str):
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "to": to_email, "subject": subject, "body": body,
+            "status": "pending", "attempts": 0, "created_at": now, "next_attempt_at": now,
+        })
+        self.wakeup.set()
+
+    async def claim_batch(self) -> List[dict]:
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            # دفعة عامل توقف قبل إنهائها
+            {"status": "sending", "lease_until": {"$lt": now}},
+        ]}
+        ids = [doc["_id"] for doc in await self.collection.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(settings.SMTP_BATCH_SIZE).to_list(None)]
+        if not ids:
+            return []
+        # المطالبة مشروطة بنفس الفلتر: إذا سبقنا عامل آخر إلى مستند فلن يتغير
+        lease_until = now + timedelta(seconds=settings.SMTP_LEASE_SECONDS)
+        await self.collection.update_many(
+            {"_id": {"$in": ids}, **due},
+            {"$set": {"status": "sending", "claimed_by": self.worker_id, "lease_until": lease_until}},
+        )
+        return await self.collection.find({"_id": {"$in": ids}, "claimed_by": self.worker_id, "status": "sending"}).to_list(None)
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(settings.SMTP_RETRY_MAX_SECONDS, settings.SMTP_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    async def deliver(self, batch: List[dict]):
+        if not settings.SMTP_USER:
+            for message in batch:
+                print(f"📧 [MOCK EMAIL] To: {message['to']}\nSubject: {message['subject']}\n{message['body']}")
+            errors = [None] * len(batch)
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                errors = await loop.run_in_executor(self.executor, self.session.send_batch, batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+
+        now = datetime.utcnow()
+        ops = []
+        for message, error in zip(batch, errors):
+            attempts = message.get("attempts", 0) + 1
+            if error is None:
+                self.sent += 1
+                update = {"$set": {"status": "sent", "sent_at": now, "attempts": attempts}, "$unset": {"lease_until": "", "claimed_by": ""}}
+            elif _is_permanent(error) or attempts >= settings.SMTP_MAX_ATTEMPTS:
+                self.failed += 1
+                print(f"Giving up on email to {message['to']} after {attempts} attempts: {error}")
+                update = {"$set": {"status": "failed", "attempts": attempts, "last_error": str(error)}, "$unset": {"lease_until": ""}}
+            else:
+                self.retried += 1
+                update = {"$set": {
+                    "status": "pending", "attempts": attempts, "last_error": str(error),
+                    "next_attempt_at": now + timedelta(seconds=self._backoff(attempts)),
+                }, "$unset": {"lease_until": "", "claimed_by": ""}}
+            ops.append(UpdateOne({"_id": message["_id"], "claimed_by": self.worker_id}, update))
+        if ops:
+            await self.collection.bulk_write(ops, ordered=False)
+
+    async def run(self):
+        idle_since = None
+        while True:
+            # قبل القراءة وليس بعدها، حتى لا تضيع رسالة أُضيفت أثناء المطالبة
+            self.wakeup.clear()
+            try:
+                batch = await self.claim_batch()
+            except Exception as e:
+                print(f"Email outbox read failed: {e}")
+                batch = []
+            if batch:
+                idle_since = None
+                try:
+                    await self.deliver(batch)
+                except Exception as e:
+                    # مثلاً انقطاع Mongo أثناء تسجيل النتائج: الرسائل تعود بعد انتهاء المهلة، والحلقة تستمر
+                    print(f"Email delivery failed: {e}")
+                    await asyncio.sleep(settings.SMTP_POLL_SECONDS)
+                continue
+
+            # لا شيء مستحق: نغلق الجلسة بعد فترة خمول وننتظر رسالة جديدة أو موعد إعادة محاولة
+            loop = asyncio.get_running_loop()
+            idle_since = idle_since or loop.time()
+            if self.session.server is not None and loop.time() - idle_since >= settings.SMTP_IDLE_SECONDS:
+                await loop.run_in_executor(self.executor, self.session.close)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), settings.SMTP_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.session.close)
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
+
+email_sender = EmailSender(db.email_outbox)
@@ -0,0 +1,97 @@
+import json
+from typing import List, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+class JSONStreamParser:
+    # يمسح كائن JSON يصل على أجزاء؛ feed تعيد الأحداث التي اكتملت: ("item", key, value) لكل عنصر في مصفوفة عليا
+    # و ("field", key, value) لكل عضو أعلى مكتمل. ما قبل القوس الأول (مثل علامة markdown) يُتجاهل
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.expect_key = True
+        self.key = None
+        self.value_start = None
+        self.item_start = None
+        self.scalar_start = None
+        self.done = False
+
+    def _emit_value(self, events, start: int, end: int):
+        value = json.loads(self.buffer[start:end])
+        depth = len(self.stack)
+        if depth == 1:
+            events.append(("field", self.key, value))
+        elif depth == 2 and self.stack[1] == "[":
+            events.append(("item", self.key, value))
+
+    def _value_position(self) -> bool:
+        # قيمة عضو في الكائن الأعلى، أو عنصر في مصفوفة عليا
+        depth = len(self.stack)
+        return (depth == 1 and not self.expect_key) or (depth == 2 and self.stack[1] == "[")
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        events = []
+        self.buffer += chunk
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf) and not self.done:
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1 and self.expect_key:
+                        self.key = json.loads(buf[self.string_start:i + 1])
+                    elif self._value_position():
+                        self._emit_value(events, self.string_start, i + 1)
+            elif not self.stack:
+                if ch == "{":
+                    self.stack.append("{")
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch in "{[":
+                if len(self.stack) == 1 and not self.expect_key:
+                    self.value_start = i
+                elif len(self.stack) == 2 and self.stack[1] == "[":
+                    self.item_start = i
+                self.stack.append(ch)
+            elif ch in "}],":
+                if self.scalar_start is not None:
+                    self._emit_value(events, self.scalar_start, i)
+                    self.scalar_start = None
+                if ch == ",":
+                    if len(self.stack) == 1:
+                        self.expect_key = True
+                else:
+                    self.stack.pop()
+                    if not self.stack:
+                        self.done = True
+                    elif len(self.stack) == 1:
+                        self._emit_value(events, self.value_start, i + 1)
+                    elif len(self.stack) == 2 and self.stack[1] == "[":
+                        self._emit_value(events, self.item_start, i + 1)
+            elif ch == ":":
+                if len(self.stack) == 1:
+                    self.expect_key = False
+            elif ch not in _WHITESPACE and self.scalar_start is None and self._value_position():
+                self.scalar_start = i
+            i += 1
+        self.pos = i
+        return events
+
+    def result(self) -> dict:
+        # يُستدعى بعد انتهاء البث لتحليل الكائن كاملاً
+        # وضع JSON في Groq لا يدعم البث، فقد يحيط النموذج الكائن بنص أو علامات markdown
+        buf = self.buffer
+        data = json.loads(buf[buf.index("{"):buf.rindex("}") + 1])
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        return data
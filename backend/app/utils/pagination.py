@@ -0,0 +1,68 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+
+# ترقيم keyset: المؤشر يحمل قيم مفاتيح الترتيب لآخر مستند في الصفحة،
+# فتكلفة الصفحة العميقة مثل تكلفة الصفحة الأولى (لا يوجد skip)
+
+# مؤشر الصفحة التالية يُرسل في هذا الرأس (ويُعرض عبر CORS في main.py)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# قيم المؤشر تأتي من العميل وتدخل الاستعلام مباشرة: نقبل فقط القيم المفردة من النوع المتوقع لكل حقل،
+# حتى لا يحقن مؤشر مصنوع مستندات عوامل مثل {"$gt": ...}
+SCALAR_TYPES = (str, int, float, ObjectId, datetime)
+FIELD_TYPES = {
+    "_id": (ObjectId,),
+    "created_at": (datetime,),
+    "rating": (int, float),
+}
+
+def _valid_value(field: str, value) -> bool:
+    if value is None:
+        # مستند بلا هذا الحقل (مثلاً فندق قديم بلا تقييم)
+        return field != "_id"
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, FIELD_TYPES.get(field, SCALAR_TYPES))
+
+def encode_cursor(doc: dict, sort: List[Tuple[str, int]]) -> str:
+    values = [doc.get(field) for field, _ in sort]
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: List[Tuple[str, int]]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(_valid_value(field, value) for (field, _), value in zip(sort, values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def keyset_filter(sort: List[Tuple[str, int]], values: list) -> dict:
+    # (a < x) OR (a == x AND b < y) ... حسب اتجاه كل مفتاح
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def fetch_page(collection, query: dict, sort: List[Tuple[str, int]], limit: int,
+                     cursor: Optional[str] = None, projection: Optional[dict] = None):
+    """Return one page of documents plus the cursor for the next page (or None)."""
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor, sort))
+        query = {"$and": [query, after]} if query else after
+    # نجلب مستندًا إضافيًا لمعرفة ما إذا كانت هناك صفحة تالية
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort)
+    return docs, next_cursor
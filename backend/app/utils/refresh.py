@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+async def refresh_periodically(index, db, interval: float):
+    # الاستيراد والعمال الآخرون يكتبون من عمليات منفصلة، لذلك نعيد قراءة الحالة دوريًا (إصدار الكتالوج)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await index.build(db)
+        except Exception as e:
+            print(f"{type(index).__name__} refresh failed: {e}")
+
+async def rebuild_on_change(index, db, version, poll: float, min_interval: float, local_versions=None):
+    # يعاد البناء فقط عندما يتغير إصدار الكتالوج بسبب كاتب آخر (عامل آخر أو المستورد)؛
+    # كتابات هذه العملية التي طبقها الفهرس بنفسه تُسجل في local_versions فلا تعيد البناء.
+    # min_interval يمنع موجة من الكتابات من إعادة تحميل الكتالوج كله مرة بعد مرة
+    built = version.version
+    last_build = time.monotonic()
+    while True:
+        await asyncio.sleep(poll)
+        current = version.version
+        if current == built:
+            continue
+        if local_versions is not None and local_versions.covers(built, current):
+            built = current
+            continue
+        if time.monotonic() - last_build < min_interval:
+            continue
+        try:
+            await index.build(db)
+            built = current
+        except Exception as e:
+            print(f"{type(index).__name__} refresh failed: {e}")
+        last_build = time.monotonic()
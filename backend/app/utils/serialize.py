@@ -0,0 +1,56 @@
+# مستندات Mongo إلى JSON مباشرة دون المرور بـ Pydantic: الحقول بترتيب النموذج، id من _id، والقيم الافتراضية للحقول الناقصة.
+# المسارات تعيد ORJSONResponse فيتخطى FastAPI التحقق؛ response_model يبقى على المسارات لمخطط OpenAPI.
+# المستندات موثوقة (من المستورد أو HostelCreate) وتُمرر القيم كما خُزنت
+from typing import Iterable, List, Optional, Type
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+def _default(value):
+    # orjson يتعامل مع datetime بنفسه؛ يبقى ObjectId فقط
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; already-encoded bytes pass through."""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+class DocumentEncoder:
+    def __init__(self, model: Type[BaseModel]):
+        # (الحقل، القيمة الافتراضية) بترتيب النموذج حتى يطابق الناتج ما كان يخرجه Pydantic
+        self.fields = [
+            (name, None if field.is_required() else field.get_default(call_default_factory=True))
+            for name, field in model.model_fields.items()
+        ]
+        self.projection = {name: 1 for name, _ in self.fields if name != "id"}
+
+    def shape(self, doc: dict, **extra) -> dict:
+        out = {}
+        for name, default in self.fields:
+            if name == "id":
+                out["id"] = str(doc["_id"])
+            else:
+                out[name] = doc.get(name, default)
+        out.update(extra)
+        return out
+
+    def encode(self, doc: dict, **extra) -> bytes:
+        return dumps(self.shape(doc, **extra))
+
+    def encode_many(self, docs: Iterable[dict]) -> bytes:
+        return dumps([self.shape(doc) for doc in docs])
+
+    def response(self, doc: dict, headers: Optional[dict] = None, **extra) -> ORJSONResponse:
+        return ORJSONResponse(self.encode(doc, **extra), headers=headers)
+
+    def list_response(self, docs: List[dict], headers: Optional[dict] = None) -> ORJSONResponse:
+        return ORJSONResponse(self.encode_many(docs), headers=headers)
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    # يجمع الاستدعاءات المتزامنة ذات المفتاح نفسه في مهمة واحدة؛ كل منتظر ينتظر عبر shield
+    # فانقطاع عميل يلغي انتظاره فقط لا العمل المشترك، وخطأ المهمة يصل لكل المنتظرين
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.leaders += 1
+
+            def _done(t: asyncio.Task):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                # إذا انقطع كل المنتظرين نقرأ الاستثناء حتى لا يظهر تحذير "never retrieved"
+                if not t.cancelled():
+                    t.exception()
+
+            task.add_done_callback(_done)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+# مشترك بين مسارات المقارنة والتحليل (المفاتيح تحمل بادئة النوع)
+llm_flight = SingleFlight()
@@ -0,0 +1,15 @@
+import json
+from typing import Any, AsyncIterator
+from fastapi.responses import StreamingResponse
+
+def sse_event(event: str, data: Any) -> str:
+    # تنسيق Server-Sent Events: اسم الحدث ثم سطر بيانات JSON واحد
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # منع التخزين المؤقت في الوكلاء (nginx) حتى تصل الأحداث فور إنتاجها
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
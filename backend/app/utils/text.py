@@ -0,0 +1,11 @@
+import re
+
+def fold(text: str) -> str:
+    # مفتاح بحث موحد: بدون مسافات طرفية وبأحرف صغيرة (Unicode كاملة، بخلاف $toLower في Mongo)
+    if not text:
+        return ""
+    return str(text).strip().lower()
+
+def prefix_pattern(text: str) -> str:
+    # regex مثبت في البداية حتى يستطيع MongoDB استخدام الفهرس
+    return "^" + re.escape(fold(text))
@@ -0,0 +1,117 @@
+# حفظ في الخلفية لمستندات لا ينتظرها أي طلب: add يعطي _id فورًا ويضع المستند في طابور يُفرغ بـ insert_many
+# عند COMPARISON_BATCH_SIZE أو كل COMPARISON_FLUSH_SECONDS. حتى يُكتب، المستند مرئي فقط عبر get في هذه العملية؛
+# الدفعة الفاشلة تعود إلى مقدمة الطابور، وعند COMPARISON_MAX_PENDING يكتب add بنفسه (ضغط عكسي)
+import asyncio
+from collections import OrderedDict
+from typing import List, Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.config import settings
+from app.database import db
+
+DUPLICATE_KEY = 11000
+
+class WriteBehindBuffer:
+    def __init__(self, collection, batch_size: int = 100, flush_seconds: float = 1.0, max_pending: int = 5000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[ObjectId, dict]" = OrderedDict()
+        # الدفعة التي يجري إدراجها الآن؛ تبقى مقروءة عبر get حتى يؤكدها الخادم
+        self.in_flight: "OrderedDict[ObjectId, dict]" = OrderedDict()
+        self.lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.written = 0
+        self.failed_flushes = 0
+
+    async def add(self, doc: dict) -> ObjectId:
+        doc.setdefault("_id", ObjectId())
+        self.pending[doc["_id"]] = doc
+        if len(self.pending) >= self.max_pending:
+            # ضغط عكسي: الطابور ممتلئ، فيكتب هذا الطلب بنفسه بدلاً من النمو بلا حد
+            await self.flush()
+        elif len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return doc["_id"]
+
+    def get(self, doc_id: ObjectId) -> Optional[dict]:
+        return self.pending.get(doc_id) or self.in_flight.get(doc_id)
+
+    def discard(self, doc_id: ObjectId) -> Optional[dict]:
+        """Drop a document that has not been sent yet; returns it, or None."""
+        return self.pending.pop(doc_id, None)
+
+    async def wait_in_flight(self, doc_id: ObjectId):
+        # مستند في دفعة قيد الإدراج: ننتظر انتهاءها قبل أي عملية عليه في Mongo
+        if doc_id in self.in_flight:
+            async with self.lock:
+                pass
+
+    async def flush(self):
+        async with self.lock:
+            while self.pending:
+                batch: List[dict] = []
+                while self.pending and len(batch) < self.batch_size:
+                    doc_id, doc = self.pending.popitem(last=False)
+                    self.in_flight[doc_id] = doc
+                    batch.append(doc)
+                try:
+                    await self.collection.insert_many(batch, ordered=False)
+                except BulkWriteError as e:
+                    # المكرر يعني أن محاولة سابقة أدرجته بالفعل؛ ما عداه يعود إلى الطابور
+                    retry = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY}
+                    self._requeue([doc for i, doc in enumerate(batch) if i in retry])
+                    self.written += len(batch) - len(retry)
+                    if retry:
+                        self.failed_flushes += 1
+                        print(f"Write-behind flush to {self.collection.name}: {len(retry)} documents will be retried")
+                        return
+                except PyMongoError as e:
+                    self._requeue(batch)
+                    self.failed_flushes += 1
+                    print(f"Write-behind flush to {self.collection.name} failed: {e}")
+                    return
+                except asyncio.CancelledError:
+                    # أُلغيت الحلقة أثناء الإدراج (الإيقاف)؛ close تعيد المحاولة، والمكرر يُعامل كمكتوب
+                    self._requeue(batch)
+                    raise
+                else:
+                    self.written += len(batch)
+                finally:
+                    for doc in batch:
+                        self.in_flight.pop(doc["_id"], None)
+
+    def _requeue(self, docs: List[dict]):
+        # تعود إلى مقدمة الطابور بترتيبها الأصلي
+        for doc in reversed(docs):
+            self.pending[doc["_id"]] = doc
+            self.pending.move_to_end(doc["_id"], last=False)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Write-behind flush to {self.collection.name} failed: {e}")
+
+    async def close(self):
+        await self.flush()
+        if self.pending:
+            print(f"Write-behind: {len(self.pending)} documents for {self.collection.name} could not be written before shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending) + len(self.in_flight),
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+        }
+
+comparison_writer = WriteBehindBuffer(
+    db.comparisons, settings.COMPARISON_BATCH_SIZE, settings.COMPARISON_FLUSH_SECONDS, settings.COMPARISON_MAX_PENDING,
+)
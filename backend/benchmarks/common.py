@@ -0,0 +1,73 @@
+# أدوات مشتركة بين سكربتات القياس
+import asyncio
+import statistics
+import subprocess
+import time
+from typing import Awaitable, Callable, Dict, List
+import httpx
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+    }
+
+async def drive(client: httpx.AsyncClient, concurrency: int, duration: float,
+                request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]], warmup: float = 1.0) -> Dict:
+    """Run `request` from `concurrency` closed-loop workers for `duration` seconds.
+
+    Requests that finish during the warmup are not recorded. Latency
+    percentiles cover successful (< 400) responses; every status is counted.
+    """
+    samples: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker(worker_id: int):
+        nonlocal errors
+        i = 0
+        while time.perf_counter() < stop_at:
+            begin = time.perf_counter()
+            try:
+                response = await request(client, worker_id * 1_000_000 + i)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            end = time.perf_counter()
+            i += 1
+            if begin < measure_from:
+                continue
+            if status is None:
+                errors += 1
+                continue
+            statuses[status] = statuses.get(status, 0) + 1
+            if status < 400:
+                samples.append(end - begin)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    result = summarize(samples)
+    result["throughput_rps"] = round(len(samples) / duration, 1)
+    result["errors"] = errors
+    result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    return result
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,81 @@
+# بديل لواجهة Groq أثناء القياس بزمن استجابة ثابت ومعروف (GROQ_BASE_URL=http://localhost:9100):
+# python -m benchmarks.groq_stub --port 9100 --latency 0.8
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+LATENCY = 0.5
+JITTER = 0.0
+
+def answer_for(messages) -> str:
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    if "detailed_analysis" in prompt:
+        return json.dumps({
+            "recommendation": "The first hostel is the best value for most travellers.",
+            "detailed_analysis": "Stubbed analysis. " * 40,
+        })
+    return json.dumps({
+        "summary": "A stubbed summary of the hostel for benchmarking.",
+        "pros": ["Good location", "Friendly staff", "Clean rooms", "Fair price"],
+        "cons": ["Noisy at night", "Small lockers", "Busy breakfast"],
+    })
+
+def usage_for(messages, content: str) -> dict:
+    # تقدير تقريبي: أربعة أحرف لكل رمز
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "stub")
+    content = answer_for(messages)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    await asyncio.sleep(LATENCY + random.uniform(0, JITTER))
+
+    if not body.get("stream"):
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage_for(messages, content),
+        })
+
+    async def events():
+        pieces = [content[i:i + 32] for i in range(0, len(content), 32)]
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        final = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": usage_for(messages, content)},
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+app = Starlette(routes=[Route("/openai/v1/chat/completions", chat_completions, methods=["POST"])])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Groq server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Seconds before each completion")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="Extra random delay, up to this many seconds")
+    args = parser.parse_args()
+    LATENCY, JITTER = args.latency, args.jitter
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
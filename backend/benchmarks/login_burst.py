@@ -0,0 +1,52 @@
+# زمن GET /api/hostels/ أثناء موجة تسجيل دخول على خادم يعمل بالفعل:
+# python -m benchmarks.login_burst --username alice --password secret
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from benchmarks.common import summarize
+
+async def read_loop(client, stop, samples):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/hostels/")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+
+async def login_loop(client, stop, args, statuses):
+    while not stop.is_set():
+        response = await client.post("/api/auth/login", data={"username": args.username, "password": args.password})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+async def run_phase(args, logins: int):
+    stop = asyncio.Event()
+    samples, statuses = [], {}
+    limits = httpx.Limits(max_connections=args.readers + logins + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        tasks = [asyncio.create_task(read_loop(client, stop, samples)) for _ in range(args.readers)]
+        tasks += [asyncio.create_task(login_loop(client, stop, args, statuses)) for _ in range(logins)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    result = summarize(samples)
+    if logins:
+        result["login_statuses"] = statuses
+    return result
+
+async def main(args):
+    report = {
+        "baseline": await run_phase(args, 0),
+        "during_logins": await run_phase(args, args.logins),
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure hostel listing latency during a burst of logins.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+# سيناريوهات القياس عبر HTTP ونتائجها بصيغة JSON؛ --spawn يشغل خادم Groq الوهمي والتطبيق ويوقفهما في النهاية:
+# python -m benchmarks.run --spawn --output results/main.json
+# python -m benchmarks.run --spawn --baseline results/main.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+import httpx
+from pymongo import MongoClient
+from app.config import settings
+from benchmarks.common import drive, git_revision
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD
+
+SCENARIOS = ["list", "detail", "login", "compare"]
+LIST_QUERIES = [
+    {},
+    {"limit": 50},
+    {"min_rating": 4},
+    {"facilities": "wifi"},
+    {"search": "grand"},
+]
+
+def sample_ids(db_name: str, count: int, seed: int):
+    client = MongoClient(settings.MONGO_URL)
+    try:
+        hostels = client[db_name].hostels
+        total = hostels.estimated_document_count()
+        if total == 0:
+            sys.exit(f"No hostels in {db_name}; run `python -m benchmarks.seed` first")
+        ids = [str(doc["_id"]) for doc in hostels.find({}, {"_id": 1}).sort("_id", 1).limit(50_000)]
+    finally:
+        client.close()
+    rng = random.Random(seed)
+    return rng.sample(ids, min(count, len(ids))), total
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/auth/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_scenarios(args, ids):
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client)
+        auth = {"Authorization": f"Bearer {token}"}
+
+        async def list_request(c, i):
+            return await c.get("/api/hostels/", params=LIST_QUERIES[i % len(LIST_QUERIES)])
+
+        async def detail_request(c, i):
+            return await c.get(f"/api/hostels/{ids[i % len(ids)]}")
+
+        async def login_request(c, i):
+            return await c.post("/api/auth/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+
+        async def compare_request(c, i):
+            rng = random.Random(i)
+            pair = rng.sample(ids, 2)
+            return await c.post("/api/compare/", json={"hostel_ids": pair, "mode": args.compare_mode}, headers=auth)
+
+        requests = {"list": list_request, "detail": detail_request, "login": login_request, "compare": compare_request}
+        for name in args.scenarios:
+            print(f"Running {name} ({args.concurrency} clients, {args.duration}s)...", file=sys.stderr)
+            results[name] = await drive(client, args.concurrency, args.duration, requests[name], args.warmup)
+    return results
+
+def compare_to_baseline(results: dict, baseline: dict):
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        delta = {}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before.get(key):
+                delta[key] = f"{(result[key] - before[key]) / before[key] * 100:+.1f}%"
+        result["delta"] = delta
+
+def wait_until_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    sys.exit(f"{url} did not come up within {timeout}s")
+
+def spawn(args):
+    """Start the stub Groq server and the app; returns the processes to stop."""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    env = {**os.environ, "DB_NAME": args.db, "GROQ_BASE_URL": stub_url, "GROQ_API_KEY": "bench"}
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.groq_stub", "--port", str(args.stub_port), "--latency", str(args.stub_latency)],
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    args.base_url = f"http://127.0.0.1:{args.port}"
+    wait_until_ready(stub_url)
+    wait_until_ready(f"{args.base_url}/metrics")
+    return [app, stub]
+
+def main(args):
+    processes = spawn(args) if args.spawn else []
+    try:
+        ids, total = sample_ids(args.db, 1000, args.seed)
+        results = asyncio.run(run_scenarios(args, ids))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare_to_baseline(results, json.load(f))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "catalogue_size": total,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "workers": args.workers if args.spawn else None,
+            "stub_latency_seconds": args.stub_latency if args.spawn else None,
+            "compare_mode": args.compare_mode,
+            "python": sys.version.split()[0],
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the HTTP benchmark scenarios.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--db", default="hostel_bench", help="Seeded database, used to sample hostel ids")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--compare-mode", choices=["full", "fast"], default="full")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--spawn", action="store_true", help="Start the stub Groq server and the app")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--stub-latency", type=float, default=0.5)
+    main(parser.parse_args())
@@ -0,0 +1,118 @@
+# كتالوج اصطناعي لقاعدة بيانات القياس (يُحذف ويعاد إنشاؤه)، عبر import_hotels.normalize_rows مثل المستورد:
+# python -m benchmarks.seed --count 100000 --db hostel_bench
+import argparse
+import asyncio
+import csv
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.auth import get_password_hash
+from app.catalogue import bump_catalogue_version
+from app.config import settings
+from app.facets import refresh_facet_summary
+from app.geo import DEFAULT_TABLE
+from app.indexes import setup_database
+from import_hotels import RATING_MAP, normalize_rows
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+ADJECTIVES = ["Grand", "Cozy", "Royal", "Urban", "Central", "Harbour", "Garden", "Sunset", "Golden", "Old Town", "Riverside", "Park"]
+NOUNS = ["Hotel", "Hostel", "Inn", "Suites", "Lodge", "Residence", "House", "Resort", "Apartments", "Backpackers"]
+STREETS = ["Main St", "High Street", "Station Rd", "Market Square", "Church Lane", "Harbour Way", "King St", "Park Avenue"]
+FACILITIES = [
+    "Free WiFi", "Free Wifi", "Wireless internet", "Parking", "Free parking", "Swimming pool", "Outdoor pool",
+    "Fitness centre", "Gym", "Breakfast included", "Restaurant", "Bar", "Air conditioning", "24-hour front desk",
+    "Airport shuttle", "Spa", "Laundry", "Shared kitchen", "Lockers", "Pets allowed", "Non-smoking rooms",
+    "Wheelchair accessible", "Elevator", "Luggage storage", "Room service", "Terrace", "Sauna", "Tour desk",
+]
+WORDS = ("clean friendly staff location quiet central view modern spacious comfortable beach city walk metro "
+         "station breakfast rooftop lively social budget family historic").split()
+
+def load_cities():
+    with open(DEFAULT_TABLE, newline="", encoding="utf-8") as f:
+        return sorted({(row["country"], row["city"]) for row in csv.DictReader(f)})
+
+def make_rows(start: int, count: int, seed: int, cities) -> list:
+    rows = []
+    for i in range(start, start + count):
+        rng = random.Random(f"{seed}:{i}")
+        country, city = rng.choice(cities)
+        rows.append({
+            "countyName": country,
+            "cityName": city,
+            "HotelName": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            "HotelRating": rng.choice(list(RATING_MAP)),
+            "Address": f"{rng.randint(1, 999)} {rng.choice(STREETS)}",
+            "PinCode": "",
+            "Description": " ".join(rng.choices(WORDS, k=rng.randint(30, 120))),
+            "HotelFacilities": ",".join(rng.sample(FACILITIES, rng.randint(2, 12))),
+            "PhoneNumber": f"+1 555 {i:07d}",
+            "HotelWebsiteUrl": f"https://example.com/{i}",
+            "Attractions": "",
+        })
+    return rows
+
+def build_batch(args):
+    start, count, seed, cities = args
+    return normalize_rows(make_rows(start, count, seed, cities))
+
+async def seed(count: int, db_name: str, batch_size: int, workers: int, seed_value: int):
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db = client[db_name]
+    cities = load_cities()
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    await db.hostels.drop()
+    in_flight = asyncio.Semaphore(4)
+    tasks = []
+    written = 0
+
+    async def write(pool, start, size):
+        nonlocal written
+        try:
+            docs = await loop.run_in_executor(pool, build_batch, (start, size, seed_value, cities))
+            await db.hostels.insert_many(docs, ordered=False)
+            written += len(docs)
+            if written % (batch_size * 20) == 0 or written == count:
+                print(f"Seeded {written}/{count} ({written / (time.perf_counter() - started):,.0f} docs/sec)")
+        finally:
+            in_flight.release()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, count, batch_size):
+            await in_flight.acquire()
+            if any(task.done() and task.exception() for task in tasks):
+                in_flight.release()
+                break
+            tasks.append(asyncio.create_task(write(pool, start, min(batch_size, count - start))))
+        # كل المهام وليس المعلقة فقط: دفعة فاشلة تعني كتالوجًا أصغر وأرقامًا مضللة
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        client.close()
+        raise SystemExit(f"Seeding failed after {written}/{count} hostels: {errors[0]!r}")
+
+    print("Building indexes...")
+    await setup_database(db)
+    await refresh_facet_summary(db)
+    await bump_catalogue_version(db)
+    await db.users.update_one(
+        {"email": BENCH_EMAIL},
+        {"$set": {"email": BENCH_EMAIL, "username": "bench", "hashed_password": get_password_hash(BENCH_PASSWORD), "is_verified": True}},
+        upsert=True,
+    )
+    print(f"Done: {written} hostels in {db_name} ({time.perf_counter() - started:.1f}s); login {BENCH_EMAIL} / {BENCH_PASSWORD}")
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic hostel catalogue for benchmarks.")
+    parser.add_argument("--count", type=int, default=10_000, help="Number of hostels (10k-1M)")
+    parser.add_argument("--db", default="hostel_bench", help="Database name (dropped and re-created)")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="Generation processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed(args.count, args.db, args.batch_size, args.workers, args.seed))
@@ -0,0 +1,60 @@
+# كلفة تحويل صفحات الفنادق إلى JSON: مسار response_model في FastAPI مقابل DocumentEncoder، دون خادم أو قاعدة بيانات:
+# python -m benchmarks.serialize --page-size 50
+import argparse
+import json
+import timeit
+from typing import List
+import orjson
+from bson import ObjectId
+from pydantic import TypeAdapter
+from app.models.hostel import HostelResponse
+from app.utils.serialize import DocumentEncoder
+from benchmarks.common import git_revision
+from benchmarks.seed import build_batch, load_cities
+
+def make_page(size: int, seed: int) -> List[dict]:
+    docs = build_batch((0, size, seed, load_cities()))
+    for doc in docs:
+        doc["_id"] = ObjectId()
+    return docs
+
+def main(args):
+    page = make_page(args.page_size, args.seed)
+    encoder = DocumentEncoder(HostelResponse)
+    projected = [{k: v for k, v in doc.items() if k == "_id" or k in encoder.projection} for doc in page]
+    adapter = TypeAdapter(List[HostelResponse])
+
+    def response_model():
+        # ما يفعله get_hostels سابقًا: إضافة id ثم تحقق FastAPI وتسلسله
+        docs = [{**doc, "id": str(doc["_id"])} for doc in page]
+        return adapter.dump_json(adapter.validate_python(docs))
+
+    def model_instance():
+        models = [HostelResponse(**doc, id=str(doc["_id"])) for doc in page]
+        return adapter.dump_json(adapter.validate_python(models))
+
+    def encoder_path():
+        return encoder.encode_many(projected)
+
+    assert json.loads(response_model()) == orjson.loads(encoder_path()), "encoder output differs from response_model"
+
+    results = {}
+    for name, fn in (("response_model", response_model), ("model_instance", model_instance), ("encoder", encoder_path)):
+        runs = timeit.repeat(fn, number=args.number, repeat=args.repeat)
+        per_page = min(runs) / args.number
+        results[name] = {"us_per_page": round(per_page * 1e6, 1), "pages_per_sec": round(1 / per_page), "bytes": len(fn())}
+    for name in ("response_model", "model_instance"):
+        results[name]["encoder_speedup"] = round(results[name]["us_per_page"] / results["encoder"]["us_per_page"], 2)
+
+    print(json.dumps({
+        "meta": {"revision": git_revision(), "page_size": args.page_size, "number": args.number, "repeat": args.repeat},
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hostel page serialization.")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--number", type=int, default=200, help="Pages per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
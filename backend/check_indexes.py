@@ -1,13 +1,81 @@
 
 import asyncio
 from app.database import get_database
+from app.indexes import setup_database
+from app.routes.compare import HISTORY_PROJECTION, HISTORY_SORT
+from app.routes.hostels import build_hostel_query, HOSTEL_SORT
+
+# الاستعلامات النموذجية التي يرسلها get_hostels من Dashboard و Compare
+CANONICAL_QUERIES = {
+    "first page": dict(),
+    "search": dict(search="hil"),
+    "country": dict(country="USA"),
+    "country + search": dict(country="USA", search="hil"),
+    "price range": dict(min_price=30, max_price=80),
+    "min rating": dict(min_rating=4),
+    "facilities": dict(facilities=["wifi", "pool"]),
+    "country + price + rating": dict(country="Canada", min_price=30, max_price=80, min_rating=3),
+    "all filters": dict(country="USA", search="hil", min_price=30, max_price=80, min_rating=3),
+}
+
+def plan_stages(plan):
+    # جمع أسماء المراحل من شجرة الخطة
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+def index_names(plan):
+    names = [plan["indexName"]] if "indexName" in plan else []
+    if "inputStage" in plan:
+        names += index_names(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        names += index_names(child)
+    return names
 
 async def check_indexes():
     db = await get_database()
-    indexes = await db.users.index_information()
-    print("Indexes on users collection:")
-    for name, info in indexes.items():
-        print(f"{name}: {info}")
+    await setup_database(db)
+
+    for collection in ("users", "hostels"):
+        indexes = await db[collection].index_information()
+        print(f"Indexes on {collection} collection:")
+        for name, info in indexes.items():
+            print(f"{name}: {info}")
+        print()
+
+    print("Query plans for canonical hostel queries:")
+    collscans = 0
+    for label, params in CANONICAL_QUERIES.items():
+        query = build_hostel_query(**params)
+        explain = await db.hostels.find(query).sort(HOSTEL_SORT).limit(50).explain()
+        winning = explain["queryPlanner"]["winningPlan"]
+        stages = plan_stages(winning)
+        status = "COLLSCAN" if "COLLSCAN" in stages else "OK"
+        if status == "COLLSCAN":
+            collscans += 1
+        print(f"[{status}] {label}: {query}")
+        print(f"    stages: {' -> '.join(s for s in stages if s)}")
+        print(f"    index: {', '.join(index_names(winning)) or '-'}")
+
+    # سجل المقارنات: يجب أن يأتي الترتيب من الفهرس (بدون مرحلة SORT في الذاكرة)
+    explain = await db.comparisons.find({"user_id": "check"}, HISTORY_PROJECTION).sort(HISTORY_SORT).limit(10).explain()
+    winning = explain["queryPlanner"]["winningPlan"]
+    stages = plan_stages(winning)
+    status = "COLLSCAN" if "COLLSCAN" in stages else "SORT" if "SORT" in stages else "OK"
+    if status != "OK":
+        collscans += 1
+    print(f"[{status}] comparison history")
+    print(f"    stages: {' -> '.join(s for s in stages if s)}")
+    print(f"    index: {', '.join(index_names(winning)) or '-'}")
+
+    print()
+    if collscans:
+        print(f"{collscans} canonical queries fall back to COLLSCAN")
+    else:
+        print("No canonical query falls back to COLLSCAN")
 
 if __name__ == "__main__":
     asyncio.run(check_indexes())
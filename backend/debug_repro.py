@@ -4,19 +4,8 @@ import os
 from app.database import get_database, db
 from app.models.user import UserCreate
 from app.auth import get_password_hash
-from fastapi import BackgroundTasks
 from app.routes.auth import register
 
-# Mock BackgroundTasks
-class MockBackgroundTasks:
-    def add_task(self, func, *args, **kwargs):
-        print(f"Mock adding task: {func.__name__}")
-        # We can try to execute it to see if it crashes, though in real app it's later
-        try:
-            func(*args, **kwargs)
-        except Exception as e:
-            print(f"Task execution failed (would happen in background): {e}")
-
 async def test_registration_logic():
     print("Testing registration logic...")
     
@@ -47,15 +36,10 @@ async def test_registration_logic():
     }
     user = UserCreate(**user_data)
     
-    bg_tasks = MockBackgroundTasks()
-
-    # We need to manually duplicate the logic because 'register' is a route handler 
-    # and might be hard to call directly without full FastAPI context (Depends etc are resolved by FastAPI)
-    # But we can call it if we pass arguments. 
-    # 'register' expects (user, background_tasks).
-    
+    # 'register' is a route handler but has no Depends, so it can be called directly.
+    # The verification email is only queued in email_outbox; nothing is sent from here.
     try:
-        response = await register(user, bg_tasks)
+        response = await register(user)
         print("Registration function returned successfully!")
         print(response)
     except Exception as e:
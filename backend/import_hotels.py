@@ -1,14 +1,28 @@
+import argparse
 import asyncio
 import csv
+import hashlib
+import json
+import mmap
 import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
 from dotenv import load_dotenv
+from app.catalogue import bump_catalogue_version
+from app.facets import refresh_facet_summary
+from app.facilities import canonical_fields
+from app.geo import geocode
+from app.indexes import ensure_collection_indexes, specs_for
+from app.utils.text import fold
 
 load_dotenv()
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "hostel_db")
+STAGING_COLLECTION = "hostels_staging"
 
 # تعيين تصنيفات النجوم إلى أرقام
 RATING_MAP = {
@@ -23,106 +37,296 @@ RATING_MAP = {
 def parse_rating(rating_str):
     return RATING_MAP.get(rating_str, 0.0)
 
-async def import_data():
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
-    collection = db["hostels"]
-    
-    # مسح البيانات الموجودة
-    print("Clearing existing data...")
-    await collection.delete_many({})
-    
-    # Path to CSV
+def natural_key(name, city, address, pin_code):
+    # هوية ثابتة للفندق بين عمليات الاستيراد: الاسم + المدينة + العنوان/الرمز البريدي
+    parts = [fold(name), fold(city), fold(address) or fold(pin_code)]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+def content_hash(doc):
+    payload = json.dumps({k: v for k, v in doc.items() if k != "content_hash"}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def normalize_row(row):
+    # تعيين الصف إلى النموذج باستخدام المفاتيح المنظفة
+    # المتوقع: countyName, cityName, HotelName, HotelRating, Address, Description
+
+    raw_country = row.get('countyName', 'Unknown')
+    # توحيد اسم الدولة
+    if raw_country.strip() in ['United States', 'USA', 'US']:
+        country = 'USA'
+    elif raw_country.strip() in ['Canada', 'CA']:
+        country = 'Canada'
+    else:
+        country = raw_country
+
+    name = row.get('HotelName', 'Unknown Hotel')
+    city = row.get('cityName', 'Unknown City')
+
+    # التقييم
+    raw_rating = row.get('HotelRating', '')
+    rating = parse_rating(raw_rating)
+    if rating == 0:
+        try:
+             rating = float(raw_rating)
+        except:
+             rating = 3.5
+
+    # السعر (عشوائي لكن ثابت لكل فندق حتى لا يتغير مع كل استيراد)
+    source_key = natural_key(name, city, row.get('Address', ''), row.get('PinCode', ''))
+    price = round(random.Random(source_key).uniform(20.0, 150.0), 2)
+
+    # الوصف والعنوان
+    desc = row.get('Description', '')
+    address = row.get('Address', '')
+    full_desc = desc # kept original description separate from address now
+
+    # المرافق
+    raw_facilities = row.get('HotelFacilities', '')
+    if raw_facilities and raw_facilities.lower() != 'null':
+        facilities = [f.strip() for f in raw_facilities.split(',') if f.strip()]
+    else:
+        facilities = ["Free WiFi", "24h Reception"]
+        if "Pool" in desc: facilities.append("Pool")
+        if "Gym" in desc or "Fitness" in desc: facilities.append("Gym")
+        if "Breakfast" in desc: facilities.append("Free Breakfast")
+
+    doc = {
+        "source_key": source_key,
+        "name": name,
+        "name_lower": fold(name),
+        "country": country,
+        "city": city,
+        "price_per_night": price,
+        "rating": rating,
+        "facilities": facilities,
+        **canonical_fields(facilities),
+        "description": full_desc[:5000],
+        "image_url": None,
+        "address": address,
+        "phone_number": row.get('PhoneNumber', ''),
+        "website": row.get('HotelWebsiteUrl', ''),
+        "attractions": row.get('Attractions', ''),
+        "pin_code": row.get('PinCode', '')
+    }
+    doc.update(geocode(doc))
+    doc["content_hash"] = content_hash(doc)
+    return doc
+
+def normalize_rows(rows):
+    # تعمل داخل عملية منفصلة؛ دالة على مستوى الوحدة حتى يمكن تمريرها عبر pickle
+    return [normalize_row(row) for row in rows]
+
+def iter_lines(csv_path, use_mmap=False):
+    # قراءة متدفقة: لا يُحمَّل الملف كاملاً في الذاكرة
+    # التعامل مع البايتات الفارغة المحتملة
+    if use_mmap:
+        with open(csv_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                yield raw.decode('utf-8', errors='replace').replace('\0', '')
+    else:
+        with open(csv_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                yield line.replace('\0', '')
+
+def iter_row_batches(csv_path, batch_size, use_mmap=False):
+    reader = csv.DictReader(iter_lines(csv_path, use_mmap))
+
+    # تنظيف العناوين (إزالة المسافات البيضاء)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+
+    print(f"Detected columns (cleaned): {reader.fieldnames}")
+
+    batch = []
+    for row in reader:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def default_csv_path():
     # مسار ملف CSV - يستخدم المسار النسبي من موقع السكريبت
     # بافتراض أن السكريبت في backend/ وملف CSV في الجذر
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
-    csv_path = os.path.join(project_root, "hotels_Data.csv")
-    
+    return os.path.join(project_root, "hotels_Data.csv")
+
+async def run_pipeline(csv_path, batch_size, max_in_flight, workers, use_mmap, write_batch):
+    """Stream the CSV, normalize batches in a process pool and hand them to write_batch."""
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    # كل الدفعات (لا المعلقة فقط) حتى لا يضيع خطأ دفعة انتهت قبل gather
+    tasks = []
     count = 0
-    with open(csv_path, 'r', encoding='utf-8', errors='replace') as f:
-        # التعامل مع البايتات الفارغة المحتملة
-        lines = (line.replace('\0', '') for line in f)
-        reader = csv.DictReader(lines)
-        
-        # تنظيف العناوين (إزالة المسافات البيضاء)
-        if reader.fieldnames:
-            reader.fieldnames = [name.strip() for name in reader.fieldnames]
-        
-        print(f"Detected columns (cleaned): {reader.fieldnames}")
-        
-        batch = []
-        for row in reader:
-            # تعيين الصف إلى النموذج باستخدام المفاتيح المنظفة
-            # المتوقع: countyName, cityName, HotelName, HotelRating, Address, Description
-            
-            raw_country = row.get('countyName', 'Unknown')
-            # توحيد اسم الدولة
-            if raw_country.strip() in ['United States', 'USA', 'US']:
-                country = 'USA'
-            elif raw_country.strip() in ['Canada', 'CA']:
-                country = 'Canada'
-            else:
-                country = raw_country
-            
-            name = row.get('HotelName', 'Unknown Hotel')
-            city = row.get('cityName', 'Unknown City')
-            
-            # التقييم
-            raw_rating = row.get('HotelRating', '')
-            rating = parse_rating(raw_rating)
-            if rating == 0:
-                try: 
-                     rating = float(raw_rating)
-                except:
-                     rating = 3.5
-            
-            # السعر (عشوائي)
-            price = round(random.uniform(20.0, 150.0), 2)
-            
-            # الوصف والعنوان
-            desc = row.get('Description', '')
-            address = row.get('Address', '')
-            full_desc = desc # kept original description separate from address now
-            
-            # المرافق
-            raw_facilities = row.get('HotelFacilities', '')
-            if raw_facilities and raw_facilities.lower() != 'null':
-                facilities = [f.strip() for f in raw_facilities.split(',') if f.strip()]
+    started = time.perf_counter()
+
+    async def process(pool, rows):
+        nonlocal count
+        try:
+            docs = await loop.run_in_executor(pool, normalize_rows, rows)
+            await write_batch(docs)
+            count += len(docs)
+            elapsed = time.perf_counter() - started
+            print(f"Processed {count} hotels... ({count / elapsed:,.0f} rows/sec)")
+        finally:
+            in_flight.release()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows in iter_row_batches(csv_path, batch_size, use_mmap):
+            # عدد محدود من الدفعات قيد المعالجة/الكتابة في نفس الوقت
+            await in_flight.acquire()
+            if any(task.done() and task.exception() for task in tasks):
+                # دفعة فشلت: نتوقف عن الجدولة بدلاً من إكمال استيراد ناقص
+                in_flight.release()
+                break
+            tasks.append(asyncio.create_task(process(pool, rows)))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        print(f"{len(errors)} batch(es) failed; first error: {errors[0]!r}")
+        raise errors[0]
+    return count, time.perf_counter() - started
+
+async def import_data(csv_path=None, batch_size=1000, max_in_flight=4, workers=None, use_mmap=False):
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    staging = db[STAGING_COLLECTION]
+    csv_path = csv_path or default_csv_path()
+    started = time.perf_counter()
+
+    # التحميل يتم في مجموعة مؤقتة، والمجموعة الحالية تبقى تخدم الموقع حتى التبديل
+    print("Preparing staging collection...")
+    await staging.drop()
+
+    async def write_batch(docs):
+        # كتابة غير مرتبة: الخادم لا يتوقف عند أول خطأ ويمكنه توزيع العمل
+        await staging.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+
+    try:
+        count, load_seconds = await run_pipeline(csv_path, batch_size, max_in_flight, workers, use_mmap, write_batch)
+    except Exception:
+        # لا نستبدل hostels بمجموعة ناقصة؛ المجموعة الحالية تبقى كما هي
+        print("Import aborted; hostels collection left unchanged")
+        await staging.drop()
+        client.close()
+        raise
+
+    # بناء الفهارس بعد التحميل أسرع من صيانتها أثناء الإدراج
+    print("Building indexes on staging collection...")
+    await ensure_collection_indexes(staging, specs_for("hostels"))
+
+    # rename مع dropTarget ذري: القراء يرون المجموعة القديمة أو الجديدة كاملة فقط
+    await staging.rename("hostels", dropTarget=True)
+    total = await db.hostels.count_documents({})
+    await refresh_facet_summary(db)
+    await bump_catalogue_version(db)
+    elapsed = time.perf_counter() - started
+
+    print(f"Finished! Total imported: {count} (collection now holds {total})")
+    print(f"Load: {load_seconds:.1f}s ({count / max(load_seconds, 1e-9):,.0f} rows/sec), total with indexes and swap: {elapsed:.1f}s")
+    client.close()
+
+async def import_incremental(csv_path=None, batch_size=1000, max_in_flight=4, workers=None, use_mmap=False):
+    """Apply only the differences between the CSV and the hostels collection.
+
+    Rows are matched on source_key; unchanged rows (same content_hash) are
+    skipped, changed rows are updated in place so _id stays stable, and rows
+    that disappeared from the CSV are deleted. Documents that were never
+    keyed (created through the API, or imported before source_key existed)
+    are matched by the same natural key but never deleted.
+    """
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    collection = db.hostels
+    csv_path = csv_path or default_csv_path()
+    started = time.perf_counter()
+
+    await ensure_collection_indexes(collection, specs_for("hostels"))
+
+    # لقطة خفيفة (إسقاط للحقول) لهويات ومحتوى المستندات الحالية
+    existing = {}
+    deletable = set()
+    projection = {"source_key": 1, "content_hash": 1, "name": 1, "city": 1, "address": 1, "pin_code": 1}
+    async for doc in collection.find({}, projection):
+        key = doc.get("source_key") or natural_key(doc.get("name", ""), doc.get("city", ""), doc.get("address", ""), doc.get("pin_code", ""))
+        existing[key] = (doc["_id"], doc.get("content_hash"))
+        if doc.get("source_key"):
+            deletable.add(key)
+    print(f"Loaded {len(existing)} existing hotel identities")
+
+    # claimed يُحدَّث فورًا لكشف الصفوف المكررة بين دفعات متزامنة؛
+    # seen والإحصاءات لا تُحدَّث إلا بعد نجاح الكتابة
+    claimed = set()
+    seen = set()
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0, "deleted": 0}
+
+    async def write_batch(docs):
+        ops = []
+        keys = []
+        batch = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        for doc in docs:
+            key = doc["source_key"]
+            if key in claimed:
+                batch["duplicates"] += 1
+                continue
+            claimed.add(key)
+            keys.append(key)
+            current = existing.get(key)
+            if current is None:
+                ops.append(InsertOne(doc))
+                batch["inserted"] += 1
+            elif current[1] != doc["content_hash"]:
+                ops.append(UpdateOne({"_id": current[0]}, {"$set": doc}))
+                batch["updated"] += 1
             else:
-                facilities = ["Free WiFi", "24h Reception"]
-                if "Pool" in desc: facilities.append("Pool")
-                if "Gym" in desc or "Fitness" in desc: facilities.append("Gym")
-                if "Breakfast" in desc: facilities.append("Free Breakfast")
-            
-            hostel_doc = {
-                "name": name,
-                "country": country,
-                "city": city,
-                "price_per_night": price,
-                "rating": rating,
-                "facilities": facilities,
-                "description": full_desc[:5000],
-                "image_url": None,
-                "address": address,
-                "phone_number": row.get('PhoneNumber', ''),
-                "website": row.get('HotelWebsiteUrl', ''),
-                "attractions": row.get('Attractions', ''),
-                "pin_code": row.get('PinCode', '')
-            }
-            
-            batch.append(hostel_doc)
-            count += 1
-            
-            if len(batch) >= 100:
-                await collection.insert_many(batch)
-                batch = []
-                print(f"Imported {count} hotels...")
-        
-        if batch:
-            await collection.insert_many(batch)
-            
-    print(f"Finished! Total imported: {count}")
+                batch["unchanged"] += 1
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+        seen.update(keys)
+        for name, value in batch.items():
+            stats[name] += value
+
+    try:
+        count, _ = await run_pipeline(csv_path, batch_size, max_in_flight, workers, use_mmap, write_batch)
+    except Exception:
+        # دفعة فشلت: لا نحذف شيئًا لأن seen غير مكتمل، لكن ما كُتب بالفعل يجب أن تراه الخوادم
+        print(f"Import aborted after inserting {stats['inserted']} and updating {stats['updated']}; delete pass skipped")
+        if stats["inserted"] or stats["updated"]:
+            await refresh_facet_summary(db)
+            await bump_catalogue_version(db)
+        client.close()
+        raise
+
+    # حذف ما اختفى من الملف فقط
+    removed = [existing[key][0] for key in deletable - seen]
+    for i in range(0, len(removed), batch_size):
+        chunk = removed[i:i + batch_size]
+        await collection.delete_many({"_id": {"$in": chunk}})
+    stats["deleted"] = len(removed)
+
+    total = await collection.count_documents({})
+    written = stats["inserted"] + stats["updated"] + stats["deleted"]
+    if written:
+        await refresh_facet_summary(db)
+        # الخوادم تلتقط الإصدار الجديد في الاستطلاع التالي وتتوقف عن الرد بـ 304 للنسخ القديمة
+        await bump_catalogue_version(db)
+    elapsed = time.perf_counter() - started
+    print(f"Finished! Processed {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/sec)")
+    print(f"Inserted {stats['inserted']}, updated {stats['updated']}, unchanged {stats['unchanged']}, "
+          f"deleted {stats['deleted']}, duplicate rows skipped {stats['duplicates']}")
+    print(f"Wrote {written} documents ({written / max(count, 1):.1%} of rows); collection now holds {total}")
+    client.close()
 
 if __name__ == "__main__":
-    asyncio.run(import_data())
+    parser = argparse.ArgumentParser(description="Import hotels_Data.csv into the hostels collection.")
+    parser.add_argument("--csv", dest="csv_path", default=None, help="Path to the CSV file (default: ../hotels_Data.csv)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Concurrent bulk_write batches")
+    parser.add_argument("--workers", type=int, default=None, help="Normalization processes (default: CPU count)")
+    parser.add_argument("--mmap", action="store_true", help="Read the CSV through mmap")
+    parser.add_argument("--incremental", action="store_true", help="Upsert changed rows and delete removed ones instead of a full reload")
+    args = parser.parse_args()
+    run = import_incremental if args.incremental else import_data
+    asyncio.run(run(args.csv_path, args.batch_size, args.max_in_flight, args.workers, args.mmap))
@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.analyses import precompute_analyses
+from app.config import settings
+from app.llm import llm_client
+
+async def main(concurrency, per_minute, limit, country):
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db = client[settings.DB_NAME]
+    await llm_client.start()
+    try:
+        query = {"country": country} if country else None
+        stats = await precompute_analyses(db, concurrency, per_minute, limit, query)
+    finally:
+        await llm_client.close()
+        client.close()
+    print(f"Scanned {stats['scanned']} hostels in {stats['seconds']}s: {stats['fresh']} up to date, "
+          f"{stats['generated']} generated, {stats['failed']} failed, {stats['pruned']} orphaned analyses removed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate AI analyses for hostels that are missing one or whose data changed.")
+    parser.add_argument("--concurrency", type=int, default=settings.ANALYSIS_PRECOMPUTE_CONCURRENCY, help="Concurrent LLM calls")
+    parser.add_argument("--per-minute", type=float, default=settings.ANALYSIS_PRECOMPUTE_PER_MINUTE, help="Maximum LLM calls started per minute (0 = unlimited)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many generations")
+    parser.add_argument("--country", default=None, help="Only hostels in this country")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.per_minute, args.limit, args.country))
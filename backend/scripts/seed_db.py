@@ -1,6 +1,8 @@
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from app.catalogue import bump_catalogue_version
 from app.config import settings
+from app.indexes import reset_migrations
 
 hostels = [
     {
@@ -51,6 +53,9 @@ async def seed():
     # Insert new
     result = await db.hostels.insert_many(hostels)
     print(f"Inserted {len(result.inserted_ids)} hostels.")
+    # المستندات بدون رموز المرافق والإحداثيات؛ تُشتق عند بدء التطبيق التالي
+    await reset_migrations(db)
+    await bump_catalogue_version(db)
     
     client.close()
 
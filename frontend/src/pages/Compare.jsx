@@ -35,7 +35,7 @@ const Compare = () => {
             if (maxPrice) params.max_price = maxPrice;
             if (minRating) params.min_rating = minRating;
 
-            const res = await axios.get('http://localhost:8000/api/hostels/', {
+            const res = await axios.get('http://localhost:8000/api/hostels/summary', {
                 params,
                 headers: { Authorization: `Bearer ${token}` }
             });
@@ -99,6 +99,10 @@ const Compare = () => {
                 headers: { Authorization: `Bearer ${token}` }
             });
             setComparisonResult(res.data);
+            // رابط قابل للمشاركة للمقارنة المحفوظة، دون إعادة تحميلها من الخادم
+            if (res.data.id) {
+                window.history.replaceState(null, '', `/compare/${res.data.id}`);
+            }
         } catch (err) {
             setError('Comparison failed. AI service might be unavailable.');
             console.error(err);
@@ -8,16 +8,32 @@ import { motion } from 'framer-motion';
 const History = () => {
     const { token, logout } = useAuth();
     const [history, setHistory] = useState([]);
+    const [total, setTotal] = useState(null);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const navigate = useNavigate();
 
+    const fetchPage = async (before) => {
+        const res = await axios.get('http://localhost:8000/api/compare/history', {
+            headers: { Authorization: `Bearer ${token}` },
+            params: before ? { before } : {}
+        });
+        setNextCursor(res.headers['x-next-cursor'] || null);
+        return res.data;
+    };
+
     useEffect(() => {
         const fetchHistory = async () => {
             try {
-                const res = await axios.get('http://localhost:8000/api/compare/history', {
-                    headers: { Authorization: `Bearer ${token}` }
-                });
-                setHistory(res.data);
+                const [page, countRes] = await Promise.all([
+                    fetchPage(null),
+                    axios.get('http://localhost:8000/api/compare/history/count', {
+                        headers: { Authorization: `Bearer ${token}` }
+                    })
+                ]);
+                setHistory(page);
+                setTotal(countRes.data.count);
             } catch (err) {
                 console.error("Failed to fetch history", err);
                 if (err.response && err.response.status === 401) {
@@ -33,6 +49,18 @@ const History = () => {
         }
     }, [token, logout]);
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(nextCursor);
+            setHistory(prev => [...prev, ...page]);
+        } catch (err) {
+            console.error("Failed to fetch history", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleDelete = async (e, id) => {
         e.stopPropagation();
         if (!confirm('Are you sure you want to delete this comparison?')) return;
@@ -42,6 +70,7 @@ const History = () => {
                 headers: { Authorization: `Bearer ${token}` }
             });
             setHistory(history.filter(item => item.id !== id));
+            setTotal(prev => (prev === null ? prev : prev - 1));
         } catch (err) {
             console.error("Failed to delete comparison", err);
         }
@@ -49,7 +78,12 @@ const History = () => {
 
     return (
         <div style={{ maxWidth: '1000px', margin: '0 auto', padding: '2rem' }}>
-            <h1 style={{ marginBottom: '2rem' }}>Your Comparison History</h1>
+            <h1 style={{ marginBottom: '2rem' }}>
+                Your Comparison History
+                {total !== null && total > 0 && (
+                    <span style={{ color: 'var(--text-muted)', fontSize: '1rem', marginLeft: '0.75rem' }}>({total})</span>
+                )}
+            </h1>
 
             {loading ? (
                 <div className="glass-panel" style={{ padding: '2rem', textAlign: 'center' }}>Loading history...</div>
@@ -60,7 +94,7 @@ const History = () => {
                             key={item.id}
                             initial={{ opacity: 0, y: 10 }}
                             animate={{ opacity: 1, y: 0 }}
-                            transition={{ delay: index * 0.1 }}
+                            transition={{ delay: (index % 10) * 0.1 }}
                             onClick={() => navigate(`/compare/${item.id}`)}
                             className="glass-panel"
                             style={{
@@ -112,6 +146,16 @@ const History = () => {
                             </button>
                         </motion.div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="glass-panel"
+                            style={{ padding: '1rem', cursor: 'pointer', color: 'var(--text-muted)', border: 'none' }}
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             ) : (
                 <div className="glass-panel" style={{ padding: '3rem', textAlign: 'center', color: 'var(--text-muted)' }}>